@@ -0,0 +1,156 @@
+import re
+import time
+import heapq
+import bisect
+import logging
+import threading
+from typing import NamedTuple
+from collections import defaultdict
+
+from django.db import DatabaseError, connection
+from django.conf import settings
+
+from .models import Company
+
+logger = logging.getLogger(__name__)
+
+
+class Suggestion(NamedTuple):
+    id: str
+    company_name: str
+    website: str
+    review_count: int
+
+
+def normalize_name(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def normalize_domain(text: str) -> str:
+    domain = re.sub(r'^[a-z][a-z0-9+.-]*://', '', text.strip().lower())
+    return domain.removeprefix('www.').split('/', 1)[0]
+
+
+class CompanyAutocompleteIndex:
+    """
+    In-process prefix index over company names and domains.
+
+    Keys live in a sorted list searched with ``bisect``. The top suggestions for every prefix up to
+    ``PREFIX_CACHE_LENGTH`` characters are precomputed, since those ranges cover most companies.
+    The index is built on first use (or at worker start via ``warm``), extended in place when this
+    worker registers a company, and rebuilt in a background thread every ``REBUILD_INTERVAL``
+    seconds to pick up other workers' companies and fresh review counts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: list[tuple[str, str]] = []
+        self._companies: dict[str, Suggestion] = {}
+        self._top: dict[str, list[str]] = {}
+        self._built_at: float | None = None
+        self._rebuilding = False
+
+    @property
+    def max_results(self) -> int:
+        return settings.COMPANY_AUTOCOMPLETE['MAX_RESULTS']
+
+    @property
+    def prefix_cache_length(self) -> int:
+        return settings.COMPANY_AUTOCOMPLETE['PREFIX_CACHE_LENGTH']
+
+    def warm(self) -> None:
+        """Build the index, logging instead of failing when the database is unavailable."""
+        try:
+            self.build()
+        except DatabaseError:
+            logger.exception('Failed to build the company autocomplete index')
+
+    def build(self) -> None:
+        companies = {}
+        keys = []
+        rows = Company.objects.values_list('id', 'company_name', 'website', 'review_count')
+        for row in rows.iterator(chunk_size=2000):
+            suggestion = Suggestion(*row)
+            companies[suggestion.id] = suggestion
+            keys.extend((key, suggestion.id) for key in self._keys_for(suggestion))
+        keys.sort()
+
+        prefixes = defaultdict(set)
+        for key, company_id in keys:
+            for length in range(1, min(len(key), self.prefix_cache_length) + 1):
+                prefixes[key[:length]].add(company_id)
+        top = {prefix: self._best(company_ids, companies) for prefix, company_ids in prefixes.items()}
+
+        with self._lock:
+            self._keys, self._companies, self._top = keys, companies, top
+            self._built_at = time.monotonic()
+
+    def add(self, company: Company) -> None:
+        """Make a newly created company suggestible without a rebuild."""
+        suggestion = Suggestion(company.id, company.company_name, company.website, company.review_count)
+
+        with self._lock:
+            if self._built_at is None:
+                return
+
+            self._companies[suggestion.id] = suggestion
+            for key in self._keys_for(suggestion):
+                bisect.insort(self._keys, (key, suggestion.id))
+                for length in range(1, min(len(key), self.prefix_cache_length) + 1):
+                    prefix = key[:length]
+                    company_ids = {*self._top.get(prefix, []), suggestion.id}
+                    self._top[prefix] = self._best(company_ids, self._companies)
+
+    def suggest(self, query: str, limit: int) -> list[Suggestion]:
+        """Companies whose name or domain starts with ``query``, most reviewed first."""
+        prefix = normalize_name(query)
+        if prefix.startswith(('http', 'www.')):
+            prefix = normalize_domain(prefix)
+        if not prefix:
+            return []
+
+        self._ensure_fresh()
+        limit = min(limit, self.max_results)
+
+        with self._lock:
+            if len(prefix) <= self.prefix_cache_length:
+                company_ids = self._top.get(prefix, [])
+            else:
+                start = bisect.bisect_left(self._keys, (prefix,))
+                end = bisect.bisect_left(self._keys, (f'{prefix}\uffff',))
+                company_ids = self._best({company_id for _, company_id in self._keys[start:end]}, self._companies)
+
+            return [self._companies[company_id] for company_id in company_ids[:limit]]
+
+    def _ensure_fresh(self) -> None:
+        if self._built_at is None:
+            self.build()
+            return
+
+        age = time.monotonic() - self._built_at
+        if age < settings.COMPANY_AUTOCOMPLETE['REBUILD_INTERVAL'] or self._rebuilding:
+            return
+
+        self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            self.warm()
+        finally:
+            self._rebuilding = False
+            connection.close()
+
+    def _best(self, company_ids, companies: dict[str, Suggestion]) -> list[str]:
+        return heapq.nlargest(
+            self.max_results,
+            company_ids,
+            key=lambda company_id: (companies[company_id].review_count, company_id),
+        )
+
+    @staticmethod
+    def _keys_for(suggestion: Suggestion) -> set[str]:
+        return {normalize_name(suggestion.company_name), normalize_domain(suggestion.website)} - {''}
+
+
+company_autocomplete = CompanyAutocompleteIndex()
@@ -0,0 +1,223 @@
+import io
+import csv
+import json
+import time
+from pathlib import Path
+from itertools import islice
+
+from django.db import models, connection, transaction
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import User, Review
+from common.helpers import category_slug
+from business.models import Company, CategoryFacet, company_search_vector
+
+COMPANY_FIELDS = [
+    'company_name',
+    'category',
+    'subcategory',
+    'first_name',
+    'last_name',
+    'job_title',
+    'work_email',
+    'phone_number',
+    'country',
+    'website',
+]
+# Fields the API lets clients omit (they default to ''), so blank values are not errors
+OPTIONAL_COMPANY_FIELDS = ['subcategory', 'first_name', 'last_name', 'job_title', 'work_email', 'phone_number']
+REVIEW_FIELDS = ['rating', 'title', 'review_body']
+
+
+def read_records(path: Path, file_format: str):
+    """
+    Yield one dict per CSV row or JSON line, reading the file lazily.
+
+    A JSON line that is malformed or does not hold an object yields the reason as a string instead.
+    """
+    with path.open(newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield f'invalid JSON ({e.msg})'
+                continue
+            yield record if isinstance(record, dict) else 'not a JSON object'
+
+
+def validation_errors(obj: models.Model, exclude: list[str] | None = None) -> str | None:
+    """Run the model's field validators (no queries), returning a one-line message if any fail."""
+    try:
+        obj.clean_fields(exclude=exclude)
+    except ValidationError as e:
+        return '; '.join(f'{field}: {messages[0]}' for field, messages in e.message_dict.items())
+    return None
+
+
+def copy_objects(cursor, table: str, objs: list[models.Model]) -> None:
+    """COPY unsaved instances into ``table``, a table with the model's columns, in one round trip."""
+    fields = objs[0]._meta.concrete_fields  # noqa: SLF001
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objs:
+        values = (field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields)
+        writer.writerow(r'\N' if value is None else value for value in values)
+    buffer.seek(0)
+
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream companies or reviews from a CSV or JSONL file into the database in batches, using COPY on PostgreSQL. '
+        'Companies are deduplicated on website; reviews reference a company (id or company_website) and a user '
+        '(id or user_email).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['companies', 'reviews'])
+        parser.add_argument('path', type=Path)
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows written per transaction')
+        parser.add_argument('--no-copy', action='store_true', help='use bulk_create even on PostgreSQL')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path.is_file():
+            msg = f'{path} does not exist.'
+            raise CommandError(msg)
+
+        file_format = options['format'] or ('jsonl' if path.suffix in {'.jsonl', '.ndjson'} else 'csv')
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        import_batch = self.import_companies if options['kind'] == 'companies' else self.import_reviews
+
+        records = read_records(path, file_format)
+        started = time.monotonic()
+        read = imported = 0
+        self.skipped = 0
+
+        while batch := list(islice(records, options['batch_size'])):
+            rows = []
+            for row, record in enumerate(batch, read + 1):
+                if isinstance(record, str):
+                    self.skip(row, record)
+                else:
+                    rows.append((row, record))
+            imported += import_batch(rows) if rows else 0
+            read += len(batch)
+            rate = read / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(
+                f'{options["kind"]}: {read} rows read, {imported} imported, {self.skipped} skipped ({rate:.0f} rows/s)'
+            )
+
+        if options['kind'] == 'companies':
+            CategoryFacet.rebuild()
+
+        elapsed = time.monotonic() - started
+        summary = f'Imported {imported} {options["kind"]} from {read} rows in {elapsed:.1f}s'
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def skip(self, row: int, reason: str) -> None:
+        self.skipped += 1
+        self.stderr.write(f'row {row}: {reason}, skipped')
+
+    def import_companies(self, rows: list[tuple[int, dict]]) -> int:
+        companies = {}
+        for row, record in rows:
+            values = {field: str(record.get(field) or '').strip() for field in COMPANY_FIELDS}
+            # Same normalization as CompanySerializer.create and Company.save
+            values['category'] = category_slug(values['category'])
+            values['subcategory'] = category_slug(values['subcategory'])
+            company = Company(**values, is_claimed=bool(values['work_email']))
+
+            blank = [field for field in OPTIONAL_COMPANY_FIELDS if not values[field]]
+            error = 'website: This field cannot be blank.' if not company.website else validation_errors(company, blank)
+            if error:
+                self.skip(row, error)
+                continue
+            companies.setdefault(company.website, company)
+
+        if not companies:
+            return 0
+
+        with transaction.atomic():
+            if self.use_copy:
+                company_ids = self.copy_companies(list(companies.values()))
+            else:
+                Company.objects.bulk_create(companies.values(), ignore_conflicts=True)
+                company_ids = list(
+                    Company.objects.filter(pk__in=[company.pk for company in companies.values()])
+                    .values_list('pk', flat=True)
+                )
+
+            if connection.vendor == 'postgresql':
+                Company.objects.filter(pk__in=company_ids).update(search_vector=company_search_vector())
+        return len(company_ids)
+
+    def copy_companies(self, companies: list[Company]) -> list[str]:
+        """COPY into a temporary table, then insert the websites not taken yet. Returns the new ids."""
+        table = connection.ops.quote_name(Company._meta.db_table)  # noqa: SLF001
+        columns = ', '.join(
+            connection.ops.quote_name(field.column)
+            for field in Company._meta.concrete_fields  # noqa: SLF001
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TEMPORARY TABLE company_import (LIKE {table}) ON COMMIT DROP')
+            copy_objects(cursor, 'company_import', companies)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) SELECT {columns} FROM company_import '  # noqa: S608
+                'ON CONFLICT (website) DO NOTHING RETURNING id'
+            )
+            company_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute('DROP TABLE company_import')
+        return company_ids
+
+    def import_reviews(self, rows: list[tuple[int, dict]]) -> int:
+        records = [record for _, record in rows]
+
+        def lookup(model, key_field, id_key, key):
+            ids = {record[id_key] for record in records if record.get(id_key)}
+            keys = {record[key] for record in records if record.get(key)}
+            rows = model.objects.filter(models.Q(pk__in=ids) | models.Q(**{f'{key_field}__in': keys}))
+            by_id, by_key = {}, {}
+            for pk, value in rows.values_list('pk', key_field):
+                by_id[pk] = by_key[value] = pk
+            return lambda record: by_id.get(record.get(id_key)) or by_key.get(record.get(key))
+
+        company_for = lookup(Company, 'website', 'company', 'company_website')
+        user_for = lookup(User, 'email', 'user', 'user_email')
+
+        reviews = []
+        for row, record in rows:
+            company_id = company_for(record)
+            user_id = user_for(record)
+            if company_id is None or user_id is None:
+                self.skip(row, 'unknown company' if company_id is None else 'unknown user')
+                continue
+
+            values = {field: record.get(field) for field in REVIEW_FIELDS}
+            review = Review(user_id=user_id, company_id=company_id, **values)
+            error = validation_errors(review, exclude=['user', 'company'])
+            if error:
+                self.skip(row, error)
+                continue
+            reviews.append(review)
+
+        if not reviews:
+            return 0
+
+        insert = self.copy_reviews if self.use_copy else None
+        Review.objects.bulk_create_with_aggregates(reviews, len(reviews), insert=insert)
+        return len(reviews)
+
+    def copy_reviews(self, reviews: list[Review]) -> None:
+        with connection.cursor() as cursor:
+            copy_objects(cursor, connection.ops.quote_name(Review._meta.db_table), reviews)  # noqa: SLF001
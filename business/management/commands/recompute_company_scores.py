@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from users.models import Review
+from business.models import (
+    STAR_COUNT_FIELDS,
+    RATING_AGGREGATE_FIELDS,
+    Company,
+    CategoryFacet,
+    rating_aggregate_expressions,
+)
+
+EMPTY_AGGREGATE = {
+    'review_count': 0,
+    'rating_sum': 0,
+    'last_review_at': None,
+    **dict.fromkeys(STAR_COUNT_FIELDS.values(), 0),
+}
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every company rating aggregate and trust score, then the category facet counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='companies recomputed per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = ''
+        recomputed = 0
+
+        while True:
+            with transaction.atomic():
+                # Review writes lock the company row first, so holding the batch keeps counts exact
+                companies = list(
+                    Company.objects.select_for_update(no_key=True)
+                    .filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .only('pk', *RATING_AGGREGATE_FIELDS)[:batch_size]
+                )
+                if not companies:
+                    break
+
+                rows = (
+                    Review.objects.published()
+                    .filter(company__in=companies)
+                    .order_by()
+                    .values('company_id')
+                    .annotate(**rating_aggregate_expressions())
+                )
+                totals = {row.pop('company_id'): row for row in rows}
+
+                for company in companies:
+                    for field, value in totals.get(company.pk, EMPTY_AGGREGATE).items():
+                        setattr(company, field, value)
+                    company.update_scores()
+
+                Company.objects.bulk_update(companies, RATING_AGGREGATE_FIELDS)
+
+            last_pk = companies[-1].pk
+            recomputed += len(companies)
+
+        CategoryFacet.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed scores for {recomputed} companies'))
@@ -0,0 +1,88 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+STAR_COUNT_FIELDS = {
+    1: 'one_star_count',
+    2: 'two_star_count',
+    3: 'three_star_count',
+    4: 'four_star_count',
+    5: 'five_star_count',
+}
+
+
+def backfill_rating_aggregate(apps, schema_editor):
+    Company = apps.get_model('business', 'Company')
+    Review = apps.get_model('users', 'Review')
+
+    rows = (
+        Review.objects.order_by()
+        .values('company_id')
+        .annotate(
+            review_count=models.Count('id'),
+            rating_sum=models.Sum('rating'),
+            last_review_at=models.Max('created_at'),
+            **{field: models.Count('id', filter=models.Q(rating=star)) for star, field in STAR_COUNT_FIELDS.items()},
+        )
+    )
+    for row in rows.iterator():
+        company_id = row.pop('company_id')
+        row['avg_rating'] = row['rating_sum'] / row['review_count']
+        Company.objects.filter(pk=company_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business', '0005_alter_company_id'),
+        ('users', '0006_alter_review_id_alter_user_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='avg_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='five_star_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='four_star_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='last_review_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='one_star_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='three_star_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='two_star_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregate, migrations.RunPython.noop),
+    ]
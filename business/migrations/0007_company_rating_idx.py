@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business', '0006_company_rating_aggregate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['avg_rating', 'id'], name='company_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_trust_score(apps, schema_editor):
+    Company = apps.get_model('business', 'Company')
+    prior_mean = settings.TRUST_SCORE['PRIOR_MEAN']
+    prior_weight = settings.TRUST_SCORE['PRIOR_WEIGHT']
+
+    Company.objects.filter(review_count__gt=0).update(
+        trust_score=models.ExpressionWrapper(
+            (prior_mean * prior_weight + models.F('rating_sum')) / (prior_weight + models.F('review_count')),
+            output_field=models.FloatField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business', '0007_company_rating_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='company',
+            name='company_rating_idx',
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='trust_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_trust_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['trust_score', 'id'], name='company_trust_score_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:10
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+from django.contrib.postgres.search import SearchVector
+
+
+def search_words(field):
+    return models.Func(
+        models.F(field),
+        models.Value(r'[^[:alnum:]]+'),
+        models.Value(' '),
+        models.Value('g'),
+        function='regexp_replace',
+        output_field=models.TextField(),
+    )
+
+
+def create_search_index(apps, schema_editor):
+    # tsvector/GIN only exist on PostgreSQL; other backends fall back to icontains search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    Company = apps.get_model('business', 'Company')
+    Company.objects.update(
+        search_vector=(
+            SearchVector(search_words('company_name'), search_words('website'), config='simple', weight='A')
+            + SearchVector(search_words('category'), search_words('subcategory'), config='simple', weight='B')
+        )
+    )
+    schema_editor.execute(
+        'CREATE INDEX company_search_vector_idx ON business_company USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS company_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business', '0008_company_trust_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
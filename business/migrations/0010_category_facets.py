@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:13
+
+from django.db import migrations, models
+
+
+def backfill_category_facets(apps, schema_editor):
+    Company = apps.get_model('business', 'Company')
+    CategoryFacet = apps.get_model('business', 'CategoryFacet')
+
+    rows = (
+        Company.objects.order_by()
+        .values('category', 'subcategory')
+        .annotate(company_count=models.Count('id'), review_count=models.Sum('review_count', default=0))
+    )
+    CategoryFacet.objects.bulk_create(CategoryFacet(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business', '0009_company_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100)),
+                ('subcategory', models.CharField(default='', max_length=200)),
+                ('company_count', models.PositiveIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['category', 'trust_score', 'id'], name='company_category_trust_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categoryfacet',
+            unique_together={('category', 'subcategory')},
+        ),
+        migrations.RunPython(backfill_category_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Record the GIN index 0009 creates (on PostgreSQL only) in the model state."""
+
+    dependencies = [
+        ('business', '0010_category_facets'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='company',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=['search_vector'], name='company_search_vector_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,6 +1,94 @@
+import re
+
 import shortuuid
 
-from django.db import models
+from django.db import models, connection, connections, transaction
+from django.conf import settings
+from django.db.models.functions import Greatest
+from django.contrib.postgres.search import SearchRank, SearchQuery, SearchVector, SearchVectorField
+from django.contrib.postgres.indexes import GinIndex
+
+STAR_COUNT_FIELDS = {
+    1: 'one_star_count',
+    2: 'two_star_count',
+    3: 'three_star_count',
+    4: 'four_star_count',
+    5: 'five_star_count',
+}
+
+RATING_AGGREGATE_FIELDS = [
+    'review_count',
+    'rating_sum',
+    'avg_rating',
+    'trust_score',
+    *STAR_COUNT_FIELDS.values(),
+    'last_review_at',
+]
+
+SEARCH_FIELDS = {'company_name', 'website', 'category', 'subcategory'}
+
+# Reviews counted in the rating aggregate (``users.Review.Status.PUBLISHED``)
+PUBLISHED_REVIEWS = models.Q(status='published')
+
+
+def rating_aggregate_expressions() -> dict:
+    """Aggregate expressions over reviews that rebuild the stored rating aggregate fields."""
+    return {
+        'review_count': models.Count('id'),
+        'rating_sum': models.Sum('rating', default=0),
+        'last_review_at': models.Max('created_at'),
+        **{field: models.Count('id', filter=models.Q(rating=star)) for star, field in STAR_COUNT_FIELDS.items()},
+    }
+
+
+def search_words(field: str) -> models.Func:
+    """Split a column on punctuation so slugs and domains index as separate words."""
+    return models.Func(
+        models.F(field),
+        models.Value(r'[^[:alnum:]]+'),
+        models.Value(' '),
+        models.Value('g'),
+        function='regexp_replace',
+        output_field=models.TextField(),
+    )
+
+
+def company_search_vector() -> SearchVector:
+    """PostgreSQL expression for ``Company.search_vector``: name and domain rank above categories."""
+    return (
+        SearchVector(search_words('company_name'), search_words('website'), config='simple', weight='A')
+        + SearchVector(search_words('category'), search_words('subcategory'), config='simple', weight='B')
+    )
+
+
+class CompanyQuerySet(models.QuerySet):
+    def search(self, term: str) -> 'CompanyQuerySet':
+        """
+        Companies matching every word of ``term`` as a prefix, best match first.
+
+        Uses the GIN-indexed ``search_vector`` on PostgreSQL and ``icontains`` elsewhere.
+        """
+        words = re.findall(r'[^\W_]+', term.lower())
+        if not words:
+            return self.none()
+
+        if connections[self.db].vendor == 'postgresql':
+            query = SearchQuery(' & '.join(f'{word}:*' for word in words), config='simple', search_type='raw')
+            return (
+                self.filter(search_vector=query)
+                .annotate(search_rank=SearchRank(models.F('search_vector'), query))
+                .order_by('-search_rank', '-trust_score', '-id')
+            )
+
+        matches = models.Q()
+        for word in words:
+            matches &= (
+                models.Q(company_name__icontains=word)
+                | models.Q(website__icontains=word)
+                | models.Q(category__icontains=word)
+                | models.Q(subcategory__icontains=word)
+            )
+        return self.filter(matches).order_by('-trust_score', '-id')
 
 
 class Company(models.Model):
@@ -21,6 +109,33 @@ class Company(models.Model):
     is_verified = models.BooleanField(default=False)
     is_claimed = models.BooleanField(default=False)
 
+    # Rating aggregate, maintained by Review.save()/Review.delete() so reads never scan reviews
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0)
+    trust_score = models.FloatField(default=0)
+    one_star_count = models.PositiveIntegerField(default=0)
+    two_star_count = models.PositiveIntegerField(default=0)
+    three_star_count = models.PositiveIntegerField(default=0)
+    four_star_count = models.PositiveIntegerField(default=0)
+    five_star_count = models.PositiveIntegerField(default=0)
+    last_review_at = models.DateTimeField(null=True, blank=True)
+
+    # Full-text document over SEARCH_FIELDS, refreshed by save() on PostgreSQL (GIN indexed)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CompanyQuerySet.as_manager()
+
+    # (category, subcategory) as loaded from the database, to move facet counts when they change
+    _loaded_facet: tuple[str, str] | None = None
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trust_score', 'id'], name='company_trust_score_idx'),
+            models.Index(fields=['category', 'trust_score', 'id'], name='company_category_trust_idx'),
+            GinIndex(fields=['search_vector'], name='company_search_vector_idx'),
+        ]
+
     def __str__(self):
         return self.company_name
 
@@ -28,20 +143,160 @@ class Company(models.Model):
         if self.work_email:
             self.is_claimed = True
 
-        return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if connection.vendor == 'postgresql':
+                Company.objects.filter(pk=self.pk).update(search_vector=company_search_vector())
+            self.sync_category_facets(adding=adding)
+        return None
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            CategoryFacet.adjust(self.category, self.subcategory, companies=-1, reviews=-self.review_count)
+        return deleted
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'category' in instance.__dict__ and 'subcategory' in instance.__dict__:
+            instance._loaded_facet = (instance.category, instance.subcategory)  # noqa: SLF001
+        return instance
+
+    def sync_category_facets(self, *, adding: bool) -> None:
+        facet = (self.category, self.subcategory)
+        if adding:
+            CategoryFacet.adjust(*facet, companies=1, reviews=self.review_count)
+        elif self._loaded_facet is not None and self._loaded_facet != facet:
+            CategoryFacet.adjust(*self._loaded_facet, companies=-1, reviews=-self.review_count)
+            CategoryFacet.adjust(*facet, companies=1, reviews=self.review_count)
+        self._loaded_facet = facet
 
     @property
     def number_of_reviews(self):
-        return self.reviews.count()
+        return self.review_count
 
     @property
     def average_rating(self):
-        return self.reviews.aggregate(models.Avg('rating'))['rating__avg'] or 0
+        return self.avg_rating
+
+    @property
+    def star_counts(self) -> dict[int, int]:
+        return {star: getattr(self, field) for star, field in STAR_COUNT_FIELDS.items()}
+
+    @property
+    def rating_distribution(self) -> list[dict]:
+        """Per-star counts and percentages, best rating first, straight from the stored aggregate."""
+        return [
+            {
+                'stars': star,
+                'count': count,
+                'percentage': round(count * 100 / self.review_count, 1) if self.review_count else 0,
+            }
+            for star, count in sorted(self.star_counts.items(), reverse=True)
+        ]
+
+    def add_rating(self, rating: int, reviewed_at) -> None:
+        """Fold a newly created or republished review into the rating aggregate."""
+        field = STAR_COUNT_FIELDS[rating]
+        setattr(self, field, getattr(self, field) + 1)
+        self.review_count += 1
+        self.rating_sum += rating
+        self.update_scores()
+        if self.last_review_at is None or reviewed_at > self.last_review_at:
+            self.last_review_at = reviewed_at
+
+    def remove_rating(self, rating: int, reviewed_at) -> None:
+        """Take a deleted or hidden review out of the rating aggregate (call after the row is gone or hidden)."""
+        field = STAR_COUNT_FIELDS[rating]
+        setattr(self, field, max(getattr(self, field) - 1, 0))
+        self.review_count = max(self.review_count - 1, 0)
+        self.rating_sum = max(self.rating_sum - rating, 0)
+        self.update_scores()
+        if self.last_review_at is None or reviewed_at >= self.last_review_at:
+            self.last_review_at = self.reviews.filter(PUBLISHED_REVIEWS).aggregate(models.Max('created_at'))[
+                'created_at__max'
+            ]
+
+    def change_rating(self, old_rating: int, new_rating: int) -> None:
+        """Move an edited review from its old rating to its new one."""
+        old_field, new_field = STAR_COUNT_FIELDS[old_rating], STAR_COUNT_FIELDS[new_rating]
+        setattr(self, old_field, max(getattr(self, old_field) - 1, 0))
+        setattr(self, new_field, getattr(self, new_field) + 1)
+        self.rating_sum = max(self.rating_sum - old_rating + new_rating, 0)
+        self.update_scores()
+
+    def recompute_rating_aggregate(self) -> None:
+        """Rebuild the rating aggregate from the published reviews."""
+        totals = self.reviews.filter(PUBLISHED_REVIEWS).aggregate(**rating_aggregate_expressions())
+        for field, value in totals.items():
+            setattr(self, field, value)
+        self.update_scores()
+
+    def update_scores(self) -> None:
+        """
+        Derive the average and the Bayesian trust score from the review count and rating sum.
+
+        The trust score pulls the average towards ``TRUST_SCORE['PRIOR_MEAN']`` as if every company
+        had ``TRUST_SCORE['PRIOR_WEIGHT']`` extra reviews at that rating, so a single 5-star review
+        does not outrank thousands of 4.8s. Companies without reviews score 0 and rank last.
+        """
+        prior_mean = settings.TRUST_SCORE['PRIOR_MEAN']
+        prior_weight = settings.TRUST_SCORE['PRIOR_WEIGHT']
+
+        if not self.review_count:
+            self.avg_rating = self.trust_score = 0
+            return
+
+        self.avg_rating = self.rating_sum / self.review_count
+        self.trust_score = (prior_mean * prior_weight + self.rating_sum) / (prior_weight + self.review_count)
 
     @property
     def is_authenticated(self):
         return True
 
+
+class CategoryFacet(models.Model):
+    """Company and review counts per category/subcategory, adjusted on every company and review write."""
+
+    category = models.CharField(max_length=100)
+    subcategory = models.CharField(max_length=200, default='')
+    company_count = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('category', 'subcategory')
+
+    def __str__(self):
+        return f'{self.category}/{self.subcategory}'
+
+    @classmethod
+    def adjust(cls, category: str, subcategory: str, companies: int = 0, reviews: int = 0) -> None:
+        if companies > 0:
+            cls.objects.get_or_create(category=category, subcategory=subcategory)
+
+        cls.objects.filter(category=category, subcategory=subcategory).update(
+            company_count=Greatest(models.F('company_count') + companies, 0),
+            review_count=Greatest(models.F('review_count') + reviews, 0),
+        )
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """Recount every facet from the companies table."""
+        rows = (
+            Company.objects.order_by()
+            .values('category', 'subcategory')
+            .annotate(company_count=models.Count('id'), review_count=models.Sum('review_count', default=0))
+        )
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(cls(**row) for row in rows)
+
 # class CompanyInfo(models.Model):
 #     about = models.TextField()
 
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from users.models import Review
+from common.helpers import category_slug
 from business.models import Company
 
 
@@ -32,22 +33,22 @@ class CompanySerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         if 'category' in validated_data:
-            validated_data['category'] = validated_data['category'].lower().replace(' ', '_')
+            validated_data['category'] = category_slug(validated_data['category'])
         if 'subcategory' in validated_data:
-            validated_data['subcategory'] = validated_data['subcategory'].lower().replace(' ', '_')
+            validated_data['subcategory'] = category_slug(validated_data['subcategory'])
 
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
         if 'category' in validated_data:
-            validated_data['category'] = validated_data['category'].lower().replace(' ', '_')
+            validated_data['category'] = category_slug(validated_data['category'])
         if 'subcategory' in validated_data:
-            validated_data['subcategory'] = validated_data['subcategory'].lower().replace(' ', '_')
+            validated_data['subcategory'] = category_slug(validated_data['subcategory'])
 
         return super().update(instance, validated_data)
 
 class CompanySummarySerializer(serializers.ModelSerializer):
-    number_of_reviews = serializers.ReadOnlyField()
+    number_of_reviews = serializers.ReadOnlyField(source='review_count')
     average_rating = serializers.ReadOnlyField(source='avg_rating')
 
     class Meta:
@@ -62,9 +63,45 @@ class CompanySummarySerializer(serializers.ModelSerializer):
             'is_verified',
             'is_claimed',
             'number_of_reviews',
-            'average_rating'
+            'average_rating',
+            'trust_score',
         ]
 
+
+class CompanyHeaderSerializer(serializers.ModelSerializer):
+    company_website = serializers.ReadOnlyField(source='website')
+    number_of_reviews = serializers.ReadOnlyField(source='review_count')
+    rating_distribution = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Company
+        fields = [
+            'company_name',
+            'company_website',
+            'is_claimed',
+            'number_of_reviews',
+            'avg_rating',
+            'trust_score',
+            'rating_distribution',
+        ]
+
+
+class CompanyRatingDistributionSerializer(serializers.ModelSerializer):
+    company_website = serializers.ReadOnlyField(source='website')
+    number_of_reviews = serializers.ReadOnlyField(source='review_count')
+    rating_distribution = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Company
+        fields = [
+            'id',
+            'company_website',
+            'number_of_reviews',
+            'avg_rating',
+            'rating_distribution',
+        ]
+
+
 class CompanyReviewSerializer(serializers.ModelSerializer):
     company = serializers.PrimaryKeyRelatedField(queryset=Company.objects.all(), many=False)
 
@@ -86,6 +123,7 @@ class CompanyReviewSerializer(serializers.ModelSerializer):
             'user_id': instance.user.id,
             'name': instance.user.name,
             'country': instance.user.country,
-            'number_of_reviews': instance.user.number_of_reviews,
+            'number_of_reviews': instance.user.review_count,
         }
         return representation
+
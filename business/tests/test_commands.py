@@ -0,0 +1,129 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.test import TestCase
+from django.core.management import call_command
+
+from users.models import User, Review
+from business.models import Company, CategoryFacet
+
+
+class TestRecomputeCompanyScoresCommand(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='tester@gmail.com',
+            name='Harper Lee',
+            country='China',
+            language='Chinese',
+        )
+        self.reviewed = Company.objects.create(
+            company_name='Reviewed', category='retail', country='USA', website='r.com'
+        )
+        self.empty = Company.objects.create(company_name='Empty', category='retail', country='USA', website='e.com')
+
+        for rating in (5, 4, 4):
+            Review.objects.create(user=self.user, company=self.reviewed, rating=rating, title='Good', review_body='Ok')
+
+    def test_recompute_company_scores(self):
+        expected = Company.objects.get(pk=self.reviewed.pk)
+        Company.objects.filter(pk=self.reviewed.pk).update(
+            review_count=7, rating_sum=1, trust_score=0, four_star_count=0
+        )
+        Company.objects.filter(pk=self.empty.pk).update(review_count=3, rating_sum=9, trust_score=3)
+
+        out = StringIO()
+        call_command('recompute_company_scores', batch_size=1, stdout=out)
+
+        self.assertIn('Recomputed scores for 2 companies', out.getvalue())
+        self.reviewed.refresh_from_db()
+        self.assertEqual(self.reviewed.review_count, 3)
+        self.assertEqual(self.reviewed.four_star_count, 2)
+        self.assertAlmostEqual(self.reviewed.trust_score, expected.trust_score)
+        self.assertEqual(self.reviewed.last_review_at, expected.last_review_at)
+
+        self.empty.refresh_from_db()
+        self.assertEqual(self.empty.review_count, 0)
+        self.assertEqual(self.empty.trust_score, 0)
+
+
+class TestImportDataCommand(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        Company.objects.create(company_name='Existing', category='retail', country='USA', website='existing.com')
+        self.user = User.objects.create(
+            email='tester@gmail.com', name='Harper Lee', country='China', language='Chinese'
+        )
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def import_data(self, *args, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_data', *args, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def check_companies_import(self, **options):
+        path = self.write(
+            'companies.csv',
+            'company_name,category,subcategory,country,website,work_email\n'
+            'Tech Solutions,Information Technology,Web Hosting,USA,techsolutions.com,a@techsolutions.com\n'
+            'Tech Duplicate,Information Technology,,USA,techsolutions.com,\n'
+            'Existing Again,Retail,,USA,existing.com,\n'
+            'No Website,Retail,,USA,,\n'
+            'Sweet Bakery,Food,,USA,sweetbakery.com,\n',
+        )
+
+        out, err = self.import_data('companies', str(path), batch_size=2, **options)
+
+        self.assertIn('Imported 2 companies from 5 rows', out)
+        self.assertIn('rows/s', out)
+        self.assertIn('row 4: website', err)
+        company = Company.objects.get(website='techsolutions.com')
+        self.assertEqual((company.company_name, company.category, company.subcategory), (
+            'Tech Solutions', 'information_technology', 'web_hosting'
+        ))
+        self.assertTrue(company.is_claimed)
+        self.assertEqual(Company.objects.get(website='existing.com').company_name, 'Existing')
+        self.assertEqual(CategoryFacet.objects.get(category='information_technology').company_count, 1)
+        self.assertEqual(list(Company.objects.search('bakery')), [Company.objects.get(website='sweetbakery.com')])
+
+    def test_import_companies_with_copy(self):
+        self.check_companies_import()
+
+    def test_import_companies_with_bulk_create(self):
+        self.check_companies_import(no_copy=True)
+
+    def test_import_reviews_jsonl(self):
+        company = Company.objects.get(website='existing.com')
+        lines = [
+            {'company_website': 'existing.com', 'user_email': self.user.email, 'rating': 5, 'title': 'A', 'review_body': 'A'},  # noqa: E501
+            {'company': company.id, 'user': self.user.id, 'rating': '3', 'title': 'B', 'review_body': 'B'},
+            {'company_website': 'missing.com', 'user': self.user.id, 'rating': 4, 'title': 'C', 'review_body': 'C'},
+            {'company': company.id, 'user': self.user.id, 'rating': 9, 'title': 'D', 'review_body': 'D'},
+        ]
+        path = self.write('reviews.jsonl', '\n'.join(json.dumps(line) for line in lines))
+
+        out, err = self.import_data('reviews', str(path))
+
+        self.assertIn('Imported 2 reviews from 4 rows', out)
+        self.assertIn('row 3: unknown company', err)
+        self.assertIn('row 4: rating', err)
+        company.refresh_from_db()
+        self.assertEqual((company.review_count, company.rating_sum), (2, 8))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.review_count, 2)
+
+    def test_import_reviews_jsonl_skips_bad_lines(self):
+        line = {'company_website': 'existing.com', 'user': self.user.id, 'rating': 4, 'title': 'A', 'review_body': 'A'}
+        path = self.write('reviews.jsonl', '\n'.join(['{"rating": 5,', '[1, 2]', json.dumps(line)]))
+
+        out, err = self.import_data('reviews', str(path))
+
+        self.assertIn('Imported 1 reviews from 3 rows', out)
+        self.assertIn('row 1: invalid JSON', err)
+        self.assertIn('row 2: not a JSON object', err)
@@ -0,0 +1,166 @@
+from django.test import TestCase
+
+from users.models import User, Review
+from business.models import Company, CategoryFacet
+
+
+class TestCompanyRatingAggregate(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='tester@gmail.com',
+            name='Harper Lee',
+            country='China',
+            language='Chinese',
+        )
+        self.company = Company.objects.create(
+            company_name='Tech Solutions Inc.',
+            category='information_technology',
+            country='USA',
+            website='https://www.techsolutions.com',
+        )
+
+    def create_review(self, rating):
+        return Review.objects.create(
+            user=self.user,
+            company=self.company,
+            rating=rating,
+            title='Great experience',
+            review_body='I had a wonderful time with this company.',
+        )
+
+    def test_empty_aggregate(self):
+        self.assertEqual(self.company.number_of_reviews, 0)
+        self.assertEqual(self.company.average_rating, 0)
+        self.assertIsNone(self.company.last_review_at)
+
+    def test_aggregate_updated_on_create(self):
+        self.create_review(5)
+        latest = self.create_review(2)
+
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.number_of_reviews, 2)
+        self.assertEqual(self.company.rating_sum, 7)
+        self.assertEqual(self.company.average_rating, 3.5)
+        self.assertEqual(self.company.star_counts, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+        self.assertEqual(self.company.last_review_at, latest.created_at)
+
+    def test_aggregate_updated_on_delete(self):
+        first = self.create_review(5)
+        latest = self.create_review(2)
+
+        latest.delete()
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.number_of_reviews, 1)
+        self.assertEqual(self.company.average_rating, 5)
+        self.assertEqual(self.company.two_star_count, 0)
+        self.assertEqual(self.company.last_review_at, first.created_at)
+
+        first.delete()
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.number_of_reviews, 0)
+        self.assertEqual(self.company.average_rating, 0)
+        self.assertIsNone(self.company.last_review_at)
+
+    def test_aggregate_updated_on_rating_edit(self):
+        review = self.create_review(5)
+        self.create_review(4)
+
+        review.rating = 1
+        review.save()
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.number_of_reviews, self.company.rating_sum), (2, 5))
+        self.assertEqual(self.company.star_counts, {1: 1, 2: 0, 3: 0, 4: 1, 5: 0})
+        self.assertEqual(self.company.average_rating, 2.5)
+
+    def test_aggregate_updated_on_user_delete(self):
+        other = User.objects.create(email='other@gmail.com', name='Ada Obi', country='Nigeria', language='English')
+        self.create_review(5)
+        Review.objects.create(user=other, company=self.company, rating=2, title='Bad', review_body='Bad.')
+
+        self.user.delete()
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.number_of_reviews, self.company.rating_sum), (1, 2))
+        self.assertEqual(CategoryFacet.objects.get(category='information_technology').review_count, 1)
+
+        Review.objects.all().delete()
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.number_of_reviews, self.company.trust_score), (0, 0))
+        other.refresh_from_db()
+        self.assertEqual(other.review_count, 0)
+
+    def test_recompute_rating_aggregate(self):
+        self.create_review(4)
+        self.create_review(3)
+        Company.objects.filter(pk=self.company.pk).update(review_count=0, rating_sum=0, avg_rating=0)
+
+        self.company.refresh_from_db()
+        self.company.recompute_rating_aggregate()
+        self.assertEqual(self.company.number_of_reviews, 2)
+        self.assertEqual(self.company.average_rating, 3.5)
+        self.assertEqual(self.company.star_counts, {1: 0, 2: 0, 3: 1, 4: 1, 5: 0})
+
+    def test_trust_score_prefers_volume(self):
+        self.assertEqual(self.company.trust_score, 0)
+
+        self.create_review(5)
+        self.company.refresh_from_db()
+        single_review_score = self.company.trust_score
+        # prior of 10 reviews at 3.0 plus one 5-star review
+        self.assertAlmostEqual(single_review_score, 35 / 11)
+
+        popular = Company.objects.create(company_name='Popular', category='retail', country='USA', website='p.com')
+        for _ in range(40):
+            Review.objects.create(user=self.user, company=popular, rating=4, title='Good', review_body='Good.')
+        popular.refresh_from_db()
+        self.assertGreater(popular.trust_score, single_review_score)
+
+
+class TestCategoryFacet(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='tester@gmail.com',
+            name='Harper Lee',
+            country='China',
+            language='Chinese',
+        )
+        self.company = Company.objects.create(
+            company_name='Tech Solutions Inc.',
+            category='information_technology',
+            subcategory='software',
+            country='USA',
+            website='https://www.techsolutions.com',
+        )
+        Review.objects.create(user=self.user, company=self.company, rating=4, title='Good', review_body='Good.')
+
+    def facet(self, category, subcategory):
+        return CategoryFacet.objects.get(category=category, subcategory=subcategory)
+
+    def test_facet_counts_follow_writes(self):
+        facet = self.facet('information_technology', 'software')
+        self.assertEqual((facet.company_count, facet.review_count), (1, 1))
+
+        self.company.reviews.get().delete()
+        facet.refresh_from_db()
+        self.assertEqual((facet.company_count, facet.review_count), (1, 0))
+
+    def test_facet_counts_move_with_category(self):
+        company = Company.objects.get(pk=self.company.pk)
+        company.subcategory = 'hardware'
+        company.save()
+
+        old = self.facet('information_technology', 'software')
+        new = self.facet('information_technology', 'hardware')
+        self.assertEqual((old.company_count, old.review_count), (0, 0))
+        self.assertEqual((new.company_count, new.review_count), (1, 1))
+
+        company.delete()
+        new.refresh_from_db()
+        self.assertEqual((new.company_count, new.review_count), (0, 0))
+
+    def test_rebuild(self):
+        CategoryFacet.objects.update(company_count=9, review_count=9)
+
+        CategoryFacet.rebuild()
+
+        facet = self.facet('information_technology', 'software')
+        self.assertEqual((facet.company_count, facet.review_count), (1, 1))
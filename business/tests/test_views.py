@@ -0,0 +1,412 @@
+import json
+from unittest import skipUnless
+from unittest.mock import patch
+
+import pytest
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User, Review
+from business.views import GetCompaniesAPIView
+from common.helpers import generate_access_token
+from business.models import Company
+from common.exceptions import QueryBudgetExceededError
+from business.autocomplete import CompanyAutocompleteIndex
+
+
+class TestCompanyViews(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='tester@gmail.com',
+            name='Harper Lee',
+            country='China',
+            language='Chinese',
+        )
+        self.token = generate_access_token(self.user)
+
+        self.tech = Company.objects.create(
+            company_name='Tech Solutions Inc.',
+            category='information_technology',
+            country='USA',
+            website='techsolutions.com',
+        )
+        self.bakery = Company.objects.create(
+            company_name='Sweet Bakery',
+            category='food',
+            country='USA',
+            website='sweetbakery.com',
+        )
+
+        self.client = APIClient()
+        self.companies_url = reverse('get-comapnies')
+
+    def create_review(self, company, rating):
+        return Review.objects.create(
+            user=self.user,
+            company=company,
+            rating=rating,
+            title='Great experience',
+            review_body='I had a wonderful time with this company.',
+        )
+
+    def test_get_companies_ordered_by_rating(self):
+        self.create_review(self.tech, 2)
+        self.create_review(self.bakery, 5)
+
+        response = self.client.get(self.companies_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        companies = response.data['data']
+        self.assertEqual([company['id'] for company in companies], [self.bakery.id, self.tech.id])
+        self.assertEqual(companies[0]['number_of_reviews'], 1)
+        self.assertEqual(companies[0]['average_rating'], 5)
+
+    def test_company_reviews_header_reads_aggregate(self):
+        self.create_review(self.tech, 4)
+        self.create_review(self.tech, 3)
+
+        response = self.client.get(reverse('company-reviews', kwargs={'website': self.tech.website}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        header = response.data['data']['company']
+        self.assertEqual(header['number_of_reviews'], 2)
+        self.assertEqual(header['avg_rating'], 3.5)
+
+    def test_delete_review_updates_aggregate(self):
+        review = self.create_review(self.tech, 4)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        response = self.client.delete(reverse('delete-review', kwargs={'review_id': review.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.tech.refresh_from_db()
+        self.assertEqual(self.tech.number_of_reviews, 0)
+        self.assertEqual(self.tech.average_rating, 0)
+
+    def test_get_companies_paginated(self):
+        response = self.client.get(self.companies_url, {'page_size': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+        pagination = response.data['pagination']
+        self.assertEqual(pagination['count'], 2)
+        self.assertIsNotNone(pagination['next'])
+        self.assertIsNotNone(pagination['next_cursor'])
+        self.assertIsNone(pagination['previous_cursor'])
+
+    def test_get_companies_cursor_pagination(self):
+        self.create_review(self.tech, 3)
+        self.create_review(self.bakery, 3)
+        extra = Company.objects.create(company_name='Top Shop', category='retail', country='USA', website='top.com')
+        self.create_review(extra, 5)
+
+        seen = []
+        response = self.client.get(self.companies_url, {'cursor': '', 'page_size': 1})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(company['id'] for company in response.data['data'])
+            next_cursor = response.data['pagination']['next_cursor']
+            if next_cursor is None:
+                break
+            response = self.client.get(self.companies_url, {'cursor': next_cursor, 'page_size': 1})
+
+        self.assertEqual(seen[0], extra.id)
+        self.assertEqual(sorted(seen), sorted([extra.id, self.tech.id, self.bakery.id]))
+        self.assertNotIn('count', response.data['pagination'])
+
+        previous_cursor = response.data['pagination']['previous_cursor']
+        response = self.client.get(self.companies_url, {'cursor': previous_cursor, 'page_size': 1})
+        self.assertEqual([company['id'] for company in response.data['data']], [seen[1]])
+
+    def test_get_companies_invalid_cursor(self):
+        response = self.client.get(self.companies_url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_companies_constant_queries(self):
+        for index in range(5):
+            company = Company.objects.create(
+                company_name=f'Company {index}',
+                category='retail',
+                country='USA',
+                website=f'company{index}.com',
+            )
+            self.create_review(company, 4)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.companies_url, {'page_size': 2})
+        self.assertEqual(len(response.data['data']), 2)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.companies_url, {'page_size': 7})
+        self.assertEqual(len(response.data['data']), 7)
+
+    def test_query_budget_exceeded(self):
+        with patch.object(GetCompaniesAPIView, 'query_budget', 1), pytest.raises(QueryBudgetExceededError):
+            self.client.get(self.companies_url)
+
+    def test_query_budget_per_vendor(self):
+        other_vendor = 'sqlite' if connection.vendor != 'sqlite' else 'postgresql'
+        with patch.object(GetCompaniesAPIView, 'query_budget', {other_vendor: 1}):
+            self.assertEqual(self.client.get(self.companies_url).status_code, status.HTTP_200_OK)
+
+        budget = {connection.vendor: 1}
+        with patch.object(GetCompaniesAPIView, 'query_budget', budget), pytest.raises(QueryBudgetExceededError):
+            self.client.get(self.companies_url)
+
+    def test_company_reviews_unknown_company(self):
+        response = self.client.get(reverse('company-reviews', kwargs={'website': 'unknown.com'}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], {'company': None, 'reviews': []})
+
+    def test_company_reviews_paginated_constant_queries(self):
+        other_user = User.objects.create(email='other@gmail.com', name='Ada', country='Kenya', language='English')
+        for rating in range(1, 6):
+            self.create_review(self.tech, rating)
+        Review.objects.create(user=other_user, company=self.tech, rating=3, title='Okay', review_body='Fine.')
+        Review.objects.create(user=other_user, company=self.bakery, rating=3, title='Okay', review_body='Fine.')
+        url = reverse('company-reviews', kwargs={'website': self.tech.website})
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'page_size': 4})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['company']['number_of_reviews'], 6)
+        self.assertEqual(len(data['reviews']), 4)
+        self.assertEqual(response.data['pagination']['count'], 6)
+        authors = {review['user']['user_id']: review['user']['number_of_reviews'] for review in data['reviews']}
+        self.assertEqual(authors[other_user.id], 2)
+        self.assertEqual(authors[self.user.id], 5)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'cursor': response.data['pagination']['next_cursor'], 'page_size': 4})
+        self.assertEqual(len(response.data['data']['reviews']), 2)
+        self.assertIsNone(response.data['pagination']['next_cursor'])
+
+    def test_company_reviews_conditional_get(self):
+        self.create_review(self.tech, 4)
+        url = reverse('company-reviews', kwargs={'website': self.tech.website})
+
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.create_review(self.tech, 2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['data']['reviews']), 2)
+
+    def test_get_companies_conditional_get(self):
+        etag = self.client.get(self.companies_url)['ETag']
+
+        response = self.client.get(self.companies_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.create_review(self.bakery, 5)
+        response = self.client.get(self.companies_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_company_rating_distribution(self):
+        for rating in (5, 5, 4, 1):
+            self.create_review(self.tech, rating)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('company-ratings', kwargs={'website': self.tech.website}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['number_of_reviews'], 4)
+        self.assertEqual(
+            data['rating_distribution'],
+            [
+                {'stars': 5, 'count': 2, 'percentage': 50.0},
+                {'stars': 4, 'count': 1, 'percentage': 25.0},
+                {'stars': 3, 'count': 0, 'percentage': 0},
+                {'stars': 2, 'count': 0, 'percentage': 0},
+                {'stars': 1, 'count': 1, 'percentage': 25.0},
+            ],
+        )
+
+        response = self.client.get(reverse('company-reviews', kwargs={'website': self.tech.website}))
+        self.assertEqual(response.data['data']['company']['rating_distribution'], data['rating_distribution'])
+
+    def test_company_rating_distribution_not_found(self):
+        response = self.client.get(reverse('company-ratings', kwargs={'website': 'unknown.com'}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_companies(self):
+        Company.objects.create(
+            company_name='Tech Repairs',
+            category='Home Services',
+            subcategory='electronics_repair',
+            country='USA',
+            website='fixit.io',
+        )
+        self.create_review(self.tech, 5)
+        search_url = reverse('search-companies')
+
+        response = self.client.get(search_url, {'q': 'tech'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pagination']['count'], 2)
+        self.assertEqual(response.data['data'][0]['id'], self.tech.id)
+        self.assertIn('trust_score', response.data['data'][0])
+
+        response = self.client.get(search_url, {'q': 'electron'})
+        self.assertEqual([company['website'] for company in response.data['data']], ['fixit.io'])
+
+        response = self.client.get(search_url, {'q': 'sweetbakery.com'})
+        self.assertEqual([company['id'] for company in response.data['data']], [self.bakery.id])
+
+        response = self.client.get(search_url, {'q': 'tech bakery'})
+        self.assertEqual(response.data['data'], [])
+
+    def test_search_companies_requires_query(self):
+        response = self.client.get(reverse('search-companies'), {'q': ' '})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == 'postgresql', 'the icontains fallback also matches inside the website')
+    def test_search_vector_follows_company_updates(self):
+        self.bakery.company_name = 'Crusty Loaves'
+        self.bakery.save()
+
+        self.assertFalse(Company.objects.search('sweet bakery').filter(pk=self.bakery.pk).exists())
+        self.assertTrue(Company.objects.search('crusty').filter(pk=self.bakery.pk).exists())
+
+    def test_company_categories(self):
+        data = {
+            'company_name': 'Bread Co',
+            'category': 'Food',
+            'subcategory': 'Bakery',
+            'country': 'USA',
+            'website': 'b.co',
+        }
+        response = self.client.post(reverse('company-register'), data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.create_review(self.bakery, 4)
+        self.create_review(self.tech, 4)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('company-categories'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['data'],
+            [
+                {
+                    'category': 'food',
+                    'company_count': 2,
+                    'review_count': 1,
+                    'subcategories': [
+                        {'subcategory': '', 'company_count': 1, 'review_count': 1},
+                        {'subcategory': 'bakery', 'company_count': 1, 'review_count': 0},
+                    ],
+                },
+                {
+                    'category': 'information_technology',
+                    'company_count': 1,
+                    'review_count': 1,
+                    'subcategories': [{'subcategory': '', 'company_count': 1, 'review_count': 1}],
+                },
+            ],
+        )
+
+    def test_get_companies_by_category(self):
+        Company.objects.create(
+            company_name='Bread Co', category='food', subcategory='bakery', country='USA', website='b.co'
+        )
+
+        response = self.client.get(self.companies_url, {'category': 'Food'})
+        self.assertEqual(response.data['pagination']['count'], 2)
+
+        response = self.client.get(self.companies_url, {'category': 'food', 'subcategory': 'Bakery'})
+        self.assertEqual([company['website'] for company in response.data['data']], ['b.co'])
+
+    def test_export_company_reviews(self):
+        Company.objects.filter(pk=self.tech.pk).update(work_email=self.user.email, is_claimed=True)
+        first = self.create_review(self.tech, 5)
+        self.create_review(self.tech, 2)
+        self.create_review(self.bakery, 4)
+        url = reverse('company-reviews-export', kwargs={'website': self.tech.website})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['rating'] for row in rows], [5, 2])
+        self.assertEqual(rows[0]['id'], first.id)
+        self.assertEqual(rows[0]['user_name'], self.user.name)
+
+        response = self.client.get(url, {'type': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'rating', 'title'])
+        self.assertEqual(len(lines), 3)
+
+    def test_export_company_reviews_requires_owner(self):
+        url = reverse('company-reviews-export', kwargs={'website': self.tech.website})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestCompanyAutocompleteView(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='tester@gmail.com', name='Harper Lee', country='China', language='Chinese'
+        )
+        self.tech = Company.objects.create(
+            company_name='Tech Solutions Inc.', category='it', country='USA', website='https://www.techsolutions.com'
+        )
+        self.techno = Company.objects.create(
+            company_name='Techno Beats', category='music', country='UK', website='technobeats.co.uk'
+        )
+        for _ in range(2):
+            Review.objects.create(user=self.user, company=self.techno, rating=5, title='Loud', review_body='Great.')
+
+        self.index = CompanyAutocompleteIndex()
+        self.index.build()
+        patcher = patch('business.views.company_autocomplete', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.autocomplete_url = reverse('autocomplete-companies')
+
+    def suggest(self, query, **params):
+        response = self.client.get(self.autocomplete_url, {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [suggestion['id'] for suggestion in response.data['data']]
+
+    def test_autocomplete_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('te'), [self.techno.id, self.tech.id])
+
+    def test_autocomplete_long_prefix_and_domain(self):
+        self.assertEqual(self.suggest('Tech Sol'), [self.tech.id])
+        self.assertEqual(self.suggest('techsolutions.c'), [self.tech.id])
+        self.assertEqual(self.suggest('www.technob'), [self.techno.id])
+        self.assertEqual(self.suggest('tech', limit=1), [self.techno.id])
+        self.assertEqual(self.suggest('zzz'), [])
+
+    def test_registered_company_is_suggested(self):
+        data = {'company_name': 'Teal Cafe', 'category': 'food', 'country': 'USA', 'website': 'tealcafe.com'}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('company-register'), data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.suggest('tea'), [response.data['data']['id']])
+        self.assertEqual(self.suggest('tealc'), [response.data['data']['id']])
@@ -4,11 +4,21 @@ from .views import (
     GetCompaniesAPIView,
     CompanyReviewsListView,
     RegisterCompanyAPIView,
+    SearchCompaniesAPIView,
+    CompanyCategoriesAPIView,
+    CompanyReviewsExportView,
+    CompanyAutocompleteAPIView,
+    CompanyRatingDistributionAPIView,
 )
 
 urlpatterns = [
     path('company/register', RegisterCompanyAPIView.as_view(), name='company-register'),
     path('companies', GetCompaniesAPIView.as_view(), name='get-comapnies'),
+    path('companies/categories', CompanyCategoriesAPIView.as_view(), name='company-categories'),
+    path('companies/search', SearchCompaniesAPIView.as_view(), name='search-companies'),
+    path('companies/autocomplete', CompanyAutocompleteAPIView.as_view(), name='autocomplete-companies'),
     path('review/<str:website>', CompanyReviewsListView.as_view(), name='company-reviews'),
+    path('company/<str:website>/reviews/export', CompanyReviewsExportView.as_view(), name='company-reviews-export'),
+    path('company/<str:website>/ratings', CompanyRatingDistributionAPIView.as_view(), name='company-ratings'),
     # TODO: route to update company data
 ]
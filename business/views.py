@@ -1,18 +1,32 @@
-from django.db.models import Avg
+import csv
+import json
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
-from rest_framework.generics import ListAPIView, GenericAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.generics import ListAPIView, GenericAPIView, RetrieveAPIView, get_object_or_404
+from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.permissions import AllowAny, IsAuthenticated
 
 from users.models import Review
-from common.responses import success_response
-from common.pagination import CustomPagination
+from common.helpers import category_slug
+from common.responses import weak_etag, success_response, conditional_response
+from common.pagination import CustomPagination, KeysetPagination
 
 # from users.serializers import ReviewSerializer
-from .models import Company
-from .serializers import CompanySerializer, CompanyReviewSerializer, CompanySummarySerializer
+from .models import STAR_COUNT_FIELDS, Company, CategoryFacet
+from .serializers import (
+    CompanySerializer,
+    CompanyHeaderSerializer,
+    CompanyReviewSerializer,
+    CompanySummarySerializer,
+    CompanyRatingDistributionSerializer,
+)
+from .autocomplete import company_autocomplete
 
 
 class RegisterCompanyAPIView(GenericAPIView):
@@ -26,45 +40,167 @@ class RegisterCompanyAPIView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         company = serializer.save()
+        transaction.on_commit(lambda: company_autocomplete.add(company))
 
         response_serializer = self.get_serializer(company)
 
         return success_response(response_serializer.data, status.HTTP_200_OK)
 
 class GetCompaniesAPIView(ListAPIView):
-    """Endpoint to fetch details of multiple Companies."""
+    """Endpoint to fetch details of multiple Companies, most trusted first."""
+
+    queryset = Company.objects.defer('search_vector')
+    serializer_class = CompanySummarySerializer
+    pagination_class = KeysetPagination
+    ordering = ('-trust_score', '-id')
+    query_budget = 3  # auth + count + page, independent of page size
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        category = self.request.query_params.get('category')
+        subcategory = self.request.query_params.get('subcategory')
+
+        if category:
+            queryset = queryset.filter(category=category_slug(category))
+        if subcategory:
+            queryset = queryset.filter(subcategory=category_slug(subcategory))
+
+        return queryset
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('category', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='filter by category'),
+            openapi.Parameter(
+                'subcategory', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='filter by subcategory'
+            ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='keyset cursor from a previous page, pass it empty to start cursor paging',
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        etag = weak_etag(*page, self.paginator.get_pagination_data())
+
+        return conditional_response(
+            request, etag, lambda: self.get_paginated_response(self.get_serializer(page, many=True).data)
+        )
+
+
+class CompanyCategoriesAPIView(GenericAPIView):
+    """Endpoint to fetch the category -> subcategory tree with company and review counts."""
+
+    query_budget = 2  # auth + facets
+
+    def get(self, request, *args, **kwargs):
+        facets = (
+            CategoryFacet.objects.filter(company_count__gt=0)
+            .order_by('category', 'subcategory')
+            .values('category', 'subcategory', 'company_count', 'review_count')
+        )
+
+        categories = {}
+        for facet in facets:
+            category = categories.setdefault(
+                facet['category'],
+                {'category': facet['category'], 'company_count': 0, 'review_count': 0, 'subcategories': []},
+            )
+            category['company_count'] += facet['company_count']
+            category['review_count'] += facet['review_count']
+            category['subcategories'].append(
+                {
+                    'subcategory': facet['subcategory'],
+                    'company_count': facet['company_count'],
+                    'review_count': facet['review_count'],
+                }
+            )
+
+        return success_response(list(categories.values()))
+
+
+class SearchCompaniesAPIView(ListAPIView):
+    """Endpoint to search Companies by name, website, category and subcategory."""
 
     serializer_class = CompanySummarySerializer
     pagination_class = CustomPagination
+    query_budget = 3  # auth + count + page
 
     def get_queryset(self):
-        return Company.objects.annotate(avg_rating=Avg('reviews__rating')).order_by('-avg_rating')
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            msg = 'q: This query parameter is required.'
+            raise ValidationError(msg)
 
+        return Company.objects.defer('search_vector').search(query)
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'q',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description='words to match against company name, website, category and subcategory',
+            ),
+        ]
+    )
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return success_response(serializer.data)
+        return self.list(request, *args, **kwargs)
+
 
+class CompanyAutocompleteAPIView(GenericAPIView):
+    """Endpoint to suggest Companies whose name or website starts with the typed prefix."""
+
+    query_budget = 1  # auth only, suggestions come from the in-process index
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='typed prefix'),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='at most 10'),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get('limit', company_autocomplete.max_results))
+        except ValueError as e:
+            msg = 'limit: A valid integer is required.'
+            raise ValidationError(msg) from e
+
+        suggestions = company_autocomplete.suggest(request.query_params.get('q', ''), max(limit, 0))
+        data = [
+            {
+                'id': suggestion.id,
+                'company_name': suggestion.company_name,
+                'website': suggestion.website,
+                'number_of_reviews': suggestion.review_count,
+            }
+            for suggestion in suggestions
+        ]
+        return success_response(data)
 
 
 class CompanyReviewsListView(ListAPIView):
-    """Endpoint to fetch all the reviews of a Company."""
+    """Endpoint to fetch a page of a Company's reviews along with the company header."""
 
-    queryset = Review.objects.all().order_by('-created_at')
     serializer_class = CompanyReviewSerializer
-    pagination_class = CustomPagination
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', '-id')
+    query_budget = 4  # auth + company + count + page
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        website = self.kwargs.get('website')
+    def get_company(self):
+        queryset = Company.objects.filter(website=self.kwargs.get('website'))
         subcategory = self.request.query_params.getlist('subcategory')
 
-        if website:
-            queryset = queryset.filter(company__website=website)
         if subcategory:
-            queryset = queryset.filter(company__subcategory=subcategory)
+            queryset = queryset.filter(subcategory__in=subcategory)
 
-        return queryset
+        return queryset.first()
+
+    def get_queryset(self):
+        return self.company.reviews.published().select_related('user')
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -74,31 +210,119 @@ class CompanyReviewsListView(ListAPIView):
                 type=openapi.TYPE_STRING,
                 description='fetch by subcategories',
             ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='keyset cursor from a previous page, pass it empty to start cursor paging',
+            ),
         ]
     )
-
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            return success_response({
-                "success": True,
-                "data": {
-                    "company": None,
-                    "reviews": []
-                }
-            })
+        self.company = self.get_company()
+        if self.company is None:
+            return success_response({'company': None, 'reviews': []})
+
+        page = self.paginate_queryset(self.get_queryset())
+        pagination = self.paginator.get_pagination_data()
+        etag = weak_etag(self.company, *page, *(review.user for review in page), pagination)
+
+        return conditional_response(request, etag, lambda: self.render_page(page, pagination))
 
-        company = queryset.first().company
-        serializer = self.get_serializer(queryset, many=True)
+    def render_page(self, page, pagination):
         data = {
-            "company": {
-                "company_name": company.company_name,
-                "company_website": company.website,
-                "is_claimed": company.is_claimed,
-                "number_of_reviews": company.number_of_reviews,
-                "avg_rating": company.average_rating,
-            },
-            "reviews": serializer.data
+            'company': CompanyHeaderSerializer(self.company).data,
+            'reviews': self.get_serializer(page, many=True).data,
         }
+        return success_response(data, pagination=pagination)
 
-        return success_response(data)
+
+class CompanyRatingDistributionAPIView(RetrieveAPIView):
+    """Endpoint to fetch the 1-5 star breakdown of a Company's reviews."""
+
+    serializer_class = CompanyRatingDistributionSerializer
+    lookup_field = 'website'
+    queryset = Company.objects.only('id', 'website', 'review_count', 'avg_rating', *STAR_COUNT_FIELDS.values())
+    query_budget = 2  # auth + company
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        return success_response(serializer.data)
+
+
+class EchoBuffer:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+class CompanyReviewsExportView(GenericAPIView):
+    """
+    Endpoint for a claimed Company to download all of its reviews as NDJSON (default) or CSV.
+
+    Rows come from a server-side cursor ``chunk_size`` at a time and are written straight into a
+    streaming response, so memory stays flat however many reviews the company has.
+    """
+
+    permission_classes = [IsAuthenticated]
+    query_budget = 2  # auth + company, the rows are fetched while streaming
+    chunk_size = 2000
+    columns = [
+        ('id', 'id'),
+        ('rating', 'rating'),
+        ('title', 'title'),
+        ('review_body', 'review_body'),
+        ('status', 'status'),
+        ('like_count', 'like_count'),
+        ('flag_count', 'flag_count'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+        ('user_id', 'user_id'),
+        ('user_name', 'user__name'),
+        ('user_country', 'user__country'),
+    ]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'type', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['ndjson', 'csv'], description='export format'
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in {'ndjson', 'csv'}:
+            msg = 'type: Must be one of ndjson, csv.'
+            raise ValidationError(msg)
+
+        company = get_object_or_404(
+            Company.objects.only('id', 'website', 'work_email', 'is_claimed'), website=kwargs['website']
+        )
+        if not company.is_claimed or company.work_email.lower() != request.user.email.lower():
+            msg = "Only the company's claimed owner can export its reviews."
+            raise PermissionDenied(msg)
+
+        rows = (
+            Review.objects.filter(company=company)
+            .order_by('created_at', 'id')
+            .values_list(*(field for _, field in self.columns))
+            .iterator(chunk_size=self.chunk_size)
+        )
+        if export_type == 'csv':
+            response = StreamingHttpResponse(self.csv_lines(rows), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(self.ndjson_lines(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{company.website}-reviews.{export_type}"'
+        return response
+
+    def ndjson_lines(self, rows):
+        names = [name for name, _ in self.columns]
+        for row in rows:
+            yield json.dumps(dict(zip(names, row, strict=True)), cls=DjangoJSONEncoder) + '\n'
+
+    def csv_lines(self, rows):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow([name for name, _ in self.columns])
+        for row in rows:
+            yield writer.writerow(row)
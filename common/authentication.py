@@ -1,3 +1,7 @@
+import time
+import hashlib
+import logging
+
 import jwt
 
 from django.conf import settings
@@ -7,6 +11,35 @@ from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.authentication import BaseAuthentication
 
 from users.models import User
+from common.caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Payloads of tokens this process has already verified, keyed by the token's SHA-256 digest
+verified_tokens = LRUCache(settings.VERIFIED_TOKEN_CACHE['MAX_SIZE'], settings.VERIFIED_TOKEN_CACHE['TTL'])
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify ``token`` and return its claims, checking the signature once per token per process.
+
+    A cached payload expires with the token's ``exp``, so expired tokens are decoded again and rejected.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = verified_tokens.get(digest)
+    if payload is None:
+        payload = jwt.decode(
+            jwt=token,
+            key=settings.JWT_AUTH['JWT_SECRET_KEY'],
+            algorithms=[settings.JWT_AUTH['JWT_ALGORITHM']],
+        )
+        ttl = payload['exp'] - time.time() if 'exp' in payload else None
+        verified_tokens.set(digest, payload, ttl)
+
+    stats = verified_tokens.stats()
+    if (stats['hits'] + stats['misses']) % settings.VERIFIED_TOKEN_CACHE['STATS_LOG_INTERVAL'] == 0:
+        logger.info('Verified-token cache: %(size)d/%(maxsize)d entries, %(hits)d hits, %(misses)d misses', stats)
+    return payload
 
 
 class JWTAuthentication(BaseAuthentication):
@@ -17,11 +50,7 @@ class JWTAuthentication(BaseAuthentication):
 
         try:
             token = auth_header.split()[1]
-            payload = jwt.decode(
-                jwt=token,
-                key=settings.JWT_AUTH['JWT_SECRET_KEY'],
-                algorithms=[settings.JWT_AUTH['JWT_ALGORITHM']],
-            )
+            payload = decode_token(token)
         except jwt.ExpiredSignatureError as e:
             msg = 'Token has expired'
             raise AuthenticationFailed(msg) from e
@@ -29,11 +58,19 @@ class JWTAuthentication(BaseAuthentication):
             msg = 'Invalid token'
             raise AuthenticationFailed(msg) from e
 
-        try:
-            user = User.objects.get(id=payload['user_id'])
-        except User.DoesNotExist as e:
+        # Refresh tokens issued before the type claim carry none, so only marked access tokens pass
+        if payload.get('type') != 'access':
+            msg = 'Invalid token'
+            raise AuthenticationFailed(msg)
+
+        user = User.get_cached(payload['user_id'])
+        if user is None:
             msg = 'User not found'
-            raise AuthenticationFailed(msg) from e
+            raise AuthenticationFailed(msg)
+
+        if payload.get('ver', 0) != user.token_version:
+            msg = 'Token has been revoked'
+            raise AuthenticationFailed(msg)
 
         return (user, token)
 
@@ -0,0 +1,114 @@
+import time
+import pickle
+import threading
+from typing import Any
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache.backends.redis import RedisCache
+
+
+def get_redis_client(feature: str):
+    """The redis-py client behind the default cache, for ``feature`` needing commands the cache API lacks."""
+    default = caches['default']
+    if not isinstance(default, RedisCache):
+        msg = f'{feature} needs the default cache to use the Redis backend.'
+        raise ImproperlyConfigured(msg)
+    return default._cache.get_client(write=True)  # noqa: SLF001
+
+
+class LRUCache:
+    """Thread-safe in-process cache holding at most ``maxsize`` entries, each expiring after its TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store ``value`` for ``ttl`` seconds (at most the cache's own TTL), evicting the least recently used."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+class TieredCache:
+    """
+    Per-process ``LRUCache`` in front of the shared Django cache, sized by ``settings.<setting>``.
+
+    Lookups try this process first, then the shared cache, then ``loader``. ``delete`` clears the
+    shared entry and this process's copy; other processes keep theirs for at most ``LOCAL_TTL``
+    seconds, which bounds how stale a read can be. Values are stored pickled, so every caller gets
+    its own copy to mutate.
+    """
+
+    def __init__(self, name: str, setting: str):
+        self.name = name
+        self.setting = setting
+        self._local = None
+
+    @property
+    def config(self) -> dict:
+        return getattr(settings, self.setting)
+
+    @property
+    def local(self) -> LRUCache:
+        if self._local is None:
+            self._local = LRUCache(self.config['MAX_SIZE'], self.config['LOCAL_TTL'])
+        return self._local
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Cached value for ``key``, calling ``loader`` on a miss. A ``None`` result is not cached."""
+        data = self.local.get(key)
+        if data is None:
+            data = cache.get(self.shared_key(key))
+            if data is None:
+                value = loader()
+                if value is None:
+                    return None
+                data = pickle.dumps(value)
+                cache.set(self.shared_key(key), data, self.config['SHARED_TTL'])
+            self.local.set(key, data)
+
+        return pickle.loads(data)  # noqa: S301
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        cache.delete(self.shared_key(key))
+
+    def shared_key(self, key: str) -> str:
+        return f'{self.name}:{key}'
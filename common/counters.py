@@ -0,0 +1,99 @@
+from django.db import models
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.functions import Greatest
+
+from common.caching import get_redis_client
+
+# Take every pending delta and clear the hash in one step, so writes after it start a new round
+CLAIM_SCRIPT = '''
+local deltas = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return deltas
+'''
+
+
+class CounterBuffer:
+    """
+    Write-behind deltas for a hot counter column, kept in one Redis hash of the default cache.
+
+    Writers add to the hash (``HINCRBY``) instead of updating the row, readers add the pending
+    delta to the stored value, and ``flush`` folds the deltas into the database in batches. A flush
+    claims the deltas before writing them, so increments that land meanwhile wait for the next run.
+    ``settings.<setting>['ENABLED']`` switches the buffer on; flush after switching it off.
+    """
+
+    def __init__(self, name: str, setting: str):
+        self.name = name
+        self.setting = setting
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, self.setting)['ENABLED']
+
+    @property
+    def key(self) -> str:
+        return caches['default'].make_key(self.name)
+
+    def get_client(self):
+        return get_redis_client(self.setting)
+
+    def add(self, pk: str, delta: int) -> int:
+        """Buffer ``delta`` for ``pk`` and return its pending total."""
+        return self.get_client().hincrby(self.key, pk, delta)
+
+    def pending(self, pks: list[str]) -> dict[str, int]:
+        """Pending deltas for ``pks`` (missing ones have nothing buffered), in one round trip."""
+        if not pks:
+            return {}
+        values = self.get_client().hmget(self.key, pks)
+        return {pk: int(value) for pk, value in zip(pks, values, strict=True) if value is not None}
+
+    def merge(self, pk: str, stored: int, delta: int = 0) -> int:
+        """Buffer ``delta`` (if any) and return the stored value plus everything pending for ``pk``."""
+        pending = self.add(pk, delta) if delta else self.pending([pk]).get(pk, 0)
+        return max(stored + pending, 0)
+
+    def apply_pending(self, instances, field: str) -> None:
+        """Add pending deltas to ``field`` on already loaded instances, so responses stay accurate."""
+        if not self.enabled:
+            return
+
+        instances = list(instances)
+        pending = self.pending([instance.pk for instance in instances])
+        for instance in instances:
+            if instance.pk in pending:
+                setattr(instance, field, max(getattr(instance, field) + pending[instance.pk], 0))
+
+    def flush(self, model: type[models.Model], field: str, batch_size: int = 500) -> int:
+        """
+        Fold every pending delta into ``model.field``, ``batch_size`` rows per UPDATE. Returns rows flushed.
+
+        The deltas are taken out of Redis before any UPDATE, so a retry can never apply them twice;
+        the batches not written when an UPDATE fails are added back. A crash mid-flush loses the rest
+        of that flush (undercounting until the next change) rather than overcounting for good.
+        """
+        client = self.get_client()
+        claimed = client.eval(CLAIM_SCRIPT, 1, self.key)
+        deltas = [(pk.decode(), int(delta)) for pk, delta in zip(claimed[::2], claimed[1::2], strict=True)]
+
+        for start in range(0, len(deltas), batch_size):
+            batch = deltas[start:start + batch_size]
+            changes = [models.When(pk=pk, then=models.Value(delta)) for pk, delta in batch if delta]
+            try:
+                if changes:
+                    model.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                        **{field: Greatest(models.F(field) + models.Case(*changes, default=models.Value(0)), 0)}
+                    )
+            except Exception:
+                self.restore(deltas[start:])
+                raise
+
+        return len(deltas)
+
+    def restore(self, deltas: list[tuple[str, int]]) -> None:
+        """Add claimed deltas that were not written back to the buffer."""
+        pipeline = self.get_client().pipeline()
+        for pk, delta in deltas:
+            pipeline.hincrby(self.key, pk, delta)
+        pipeline.execute()
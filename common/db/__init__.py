@@ -0,0 +1,65 @@
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    """
+    Per-process counters of database connection checkouts, kept by ``common.db.postgresql``.
+
+    Connections are persistent (``CONN_MAX_AGE``), one per thread, so nothing waits on a shared pool;
+    a checkout either reuses the thread's connection after its health check or opens a new one.
+    A summary is logged every ``DB_CONNECTION_STATS['LOG_INTERVAL']`` checkouts.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = 0
+        self.opened = 0
+        self.unusable = 0
+        self.checkouts = 0
+        self.reused = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def record_open(self, delta: int) -> None:
+        with self.lock:
+            self.open += delta
+            self.opened += max(delta, 0)
+
+    def record_unusable(self) -> None:
+        with self.lock:
+            self.unusable += 1
+
+    def record_checkout(self, seconds: float, *, reused: bool) -> None:
+        with self.lock:
+            self.checkouts += 1
+            self.reused += reused
+            self.checkout_seconds += seconds
+            self.max_checkout_seconds = max(self.max_checkout_seconds, seconds)
+            log = self.checkouts % settings.DB_CONNECTION_STATS['LOG_INTERVAL'] == 0
+
+        if log:
+            logger.info(
+                'DB connections: %(open)d open, %(opened)d opened, %(unusable)d unusable; %(checkouts)d checkouts, '
+                '%(reused)d reused, avg %(avg_checkout_ms).1f ms, max %(max_checkout_ms).1f ms',
+                self.snapshot(),
+            )
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                'open': self.open,
+                'opened': self.opened,
+                'unusable': self.unusable,
+                'checkouts': self.checkouts,
+                'reused': self.reused,
+                'avg_checkout_ms': self.checkout_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+                'max_checkout_ms': self.max_checkout_seconds * 1000,
+            }
+
+
+connection_stats = ConnectionStats()
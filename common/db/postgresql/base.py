@@ -0,0 +1,75 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from common.db import connection_stats
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that records connection checkouts in ``common.db.connection_stats``.
+
+    A checkout is the first database access after a request starts (or ever, outside requests): the
+    health check of the persistent connection, plus opening a new one when there is none or it failed.
+    """
+
+    checked_out = False
+    checking_out = False  # connecting runs queries, which must not start a checkout of their own
+    checkout_started = None
+    checkout_reused = False
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        connection_stats.record_open(1)
+        return connection
+
+    def close(self):
+        was_open = self.connection is not None
+        try:
+            super().close()
+        finally:
+            if was_open and self.connection is None:
+                connection_stats.record_open(-1)
+
+    def begin_checkout(self):
+        if self.checkout_started is None:
+            self.checkout_started = time.perf_counter()
+            self.checkout_reused = self.connection is not None
+
+    def close_if_health_check_failed(self):
+        if not self.checked_out:
+            self.begin_checkout()
+
+        was_open = self.connection is not None
+        super().close_if_health_check_failed()
+        if was_open and self.connection is None:
+            connection_stats.record_unusable()
+            self.checkout_reused = False
+
+    def ensure_connection(self):
+        if self.checked_out or self.checking_out:
+            super().ensure_connection()
+            return
+
+        self.checking_out = True
+        self.begin_checkout()
+        try:
+            super().ensure_connection()
+            connection_stats.record_checkout(
+                time.perf_counter() - self.checkout_started, reused=self.checkout_reused
+            )
+            self.checked_out = True
+        finally:
+            self.checking_out = False
+            self.checkout_started = None
+
+    def close_if_unusable_or_obsolete(self):
+        # Called as every request starts and finishes, so each request checks the connection out again.
+        # Its own autocommit check touches the connection without being a checkout.
+        self.checking_out = True
+        try:
+            super().close_if_unusable_or_obsolete()
+        finally:
+            self.checking_out = False
+        self.checked_out = False
+        self.checkout_started = None
@@ -5,7 +5,7 @@ from django.http import Http404
 from rest_framework import serializers
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
-from rest_framework.exceptions import APIException, PermissionDenied
+from rest_framework.exceptions import NotFound, Throttled, APIException, PermissionDenied
 
 from .responses import error_response
 
@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 
 
 def custom_exception_handler(exception, context) -> Response | None:
-    if not isinstance(exception, serializers.ValidationError | Http404 | PermissionDenied):
+    if not isinstance(exception, serializers.ValidationError | Http404 | NotFound | PermissionDenied | Throttled):
         logger.exception(
             'An exception occurred while handling request %s',
             context['request'].get_full_path(),
@@ -32,13 +32,26 @@ def custom_exception_handler(exception, context) -> Response | None:
         else:
             error_message = str(exception.detail)
 
-        return error_response(
+        error = error_response(
             error=error_message,
             status_code=response.status_code,
         )
+        # Keep the headers DRF set for the exception
+        for header in ('Retry-After', 'WWW-Authenticate'):
+            if header in response:
+                error[header] = response[header]
+        return error
         # return error_response(
         #     error=[exception.detail] if isinstance(exception.detail, str) else exception.detail,
         #     status_code=response.status_code,
         # )
 
     return error_response(error=str(exception), status_code=response.status_code)
+
+
+class QueryBudgetExceededError(Exception):
+    """Raised when a view runs more SQL statements than its declared ``query_budget``."""
+
+
+class EmailTransportError(Exception):
+    """Raised by an email transport when a message could not be handed over for delivery."""
@@ -1,55 +1,83 @@
-import logging
+import secrets
 
 import jwt
-import requests
 
 from django.conf import settings
 from django.utils import timezone
+from django.core.cache import cache
 
-logger = logging.getLogger(__name__)
+from common.mail import OutgoingEmail, get_email_transport
+from common.caching import get_redis_client
 
+# Move a refresh token family from jti ARGV[1] to ARGV[2] in one round trip. Any other current jti
+# means ARGV[1] was replayed or the family was revoked, so the whole family is dropped.
+ROTATE_REFRESH_FAMILY_SCRIPT = '''
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+return 1
+'''
 
-def send_email(to: str, subject: str, html: str) -> dict:
+
+def category_slug(value: str) -> str:
+    """Normalize a category or subcategory label into the slug stored on companies."""
+    return value.lower().replace(' ', '_')
+
+
+def send_email(to: str, subject: str, html: str) -> None:
     """
-    Send an email using the Plunk API.
+    Send an email right away through the configured transport, raising ``EmailTransportError`` if it fails.
+
+    Requests should not call this directly: queue the email with ``OutboxEmail.queue`` instead.
 
     Args:
         to (str or list): The recipient's email address(es).
         subject (str): The subject of the email.
         html (str): The HTML content of the email.
     """
-    logger.info(f'Sending email to {to} with subject: {subject}')  # noqa: G004
-
-    url = 'https://api.useplunk.com/v1/send'
-    headers = {'Authorization': f'Bearer {settings.PLUNK_API_KEY}', 'Content-Type': 'application/json'}
-
-    payload = {
-        'subject': subject,
-        'body': html,
-        'to': to,
-    }
-
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
-        response.raise_for_status()
-        logger.info(f'Email sent successfully to {to}')  # noqa: G004
-    except requests.RequestException:
-        logger.exception('Failed to send email')
+    get_email_transport().send(OutgoingEmail(to, subject, html))
 
 
 def generate_access_token(user):
     payload = {
         'user_id': user.id,
+        'ver': user.token_version,
+        'type': 'access',
         'iat': timezone.now(),
         'exp': timezone.now() + settings.JWT_AUTH['JWT_EXPIRATION_DELTA'],
     }
     return jwt.encode(payload, settings.JWT_AUTH['JWT_SECRET_KEY'], algorithm=settings.JWT_AUTH['JWT_ALGORITHM'])
 
 
-def generate_refresh_token(user):
+def generate_refresh_token(user, rotated: dict | None = None) -> str | None:
+    """
+    Issue a refresh token and record its ``jti`` as the current one of its family in the Redis cache.
+
+    Login starts a new family. Passing the verified payload of the refresh token being exchanged as
+    ``rotated`` continues that family instead, but only while it is still the family's current token:
+    a replayed or revoked token revokes the whole family and ``None`` is returned.
+    """
+    lifetime = settings.JWT_AUTH['JWT_REFRESH_EXPIRATION_DELTA']
+    jti = secrets.token_urlsafe(16)
+    family = rotated['fam'] if rotated else secrets.token_urlsafe(16)
+
+    client = get_redis_client('Refresh token rotation')
+    key = cache.make_key(f'refresh-family:{family}')
+    ttl = int(lifetime.total_seconds() * 1000)
+    if rotated is None:
+        client.set(key, jti, px=ttl)
+    elif not client.eval(ROTATE_REFRESH_FAMILY_SCRIPT, 1, key, rotated['jti'], jti, ttl):
+        return None
+
     payload = {
         'user_id': user.id,
+        'ver': user.token_version,
+        'type': 'refresh',
+        'jti': jti,
+        'fam': family,
         'iat': timezone.now(),
-        'exp': timezone.now() + settings.JWT_AUTH['JWT_REFRESH_EXPIRATION_DELTA'],
+        'exp': timezone.now() + lifetime,
     }
     return jwt.encode(payload, settings.JWT_AUTH['JWT_SECRET_KEY'], algorithm=settings.JWT_AUTH['JWT_ALGORITHM'])
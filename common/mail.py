@@ -0,0 +1,128 @@
+import json
+import logging
+import functools
+import threading
+from typing import NamedTuple
+from pathlib import Path
+from itertools import groupby
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils.module_loading import import_string
+
+from .exceptions import EmailTransportError
+
+logger = logging.getLogger(__name__)
+
+
+class OutgoingEmail(NamedTuple):
+    to: str
+    subject: str
+    html: str
+
+
+class EmailTransport:
+    """Hands emails over for delivery. Subclasses implement ``send``, raising ``EmailTransportError``."""
+
+    def send(self, email: OutgoingEmail) -> None:
+        raise NotImplementedError
+
+    def send_many(self, emails: list[OutgoingEmail]) -> list[EmailTransportError | None]:
+        """Send every email, returning the error (or ``None``) for each in order."""
+        errors = []
+        for email in emails:
+            try:
+                self.send(email)
+            except EmailTransportError as e:
+                errors.append(e)
+            else:
+                errors.append(None)
+        return errors
+
+
+class PlunkTransport(EmailTransport):
+    """
+    Sends through the Plunk API over one pooled keep-alive session per process (``PLUNK_TRANSPORT``).
+
+    With ``BATCH_SIZE`` above 1, ``send_many`` sends emails with the same subject and body as one API
+    call addressed to up to that many recipients.
+    """
+
+    url = 'https://api.useplunk.com/v1/send'
+
+    def __init__(self):
+        config = settings.PLUNK_TRANSPORT
+        self.timeout = (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+        self.batch_size = config['BATCH_SIZE']
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': f'Bearer {settings.PLUNK_API_KEY}'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config['POOL_SIZE'], pool_block=True)
+        self.session.mount('https://', adapter)
+
+    def send(self, email: OutgoingEmail) -> None:
+        self.post(email.to, email.subject, email.html)
+
+    def send_many(self, emails: list[OutgoingEmail]) -> list[EmailTransportError | None]:
+        if self.batch_size <= 1:
+            return super().send_many(emails)
+
+        errors: list[EmailTransportError | None] = [None] * len(emails)
+        indexed = sorted(enumerate(emails), key=lambda item: (item[1].subject, item[1].html))
+        for (subject, html), group in groupby(indexed, key=lambda item: (item[1].subject, item[1].html)):
+            group = list(group)  # noqa: PLW2901
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                try:
+                    self.post([email.to for _, email in batch], subject, html)
+                except EmailTransportError as e:
+                    for index, _ in batch:
+                        errors[index] = e
+        return errors
+
+    def post(self, to: str | list[str], subject: str, html: str) -> None:
+        logger.info(f'Sending email to {to} with subject: {subject}')  # noqa: G004
+        try:
+            response = self.session.post(
+                self.url, json={'subject': subject, 'body': html, 'to': to}, timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.exception('Failed to send email')
+            raise EmailTransportError(str(e)) from e
+
+
+class MemoryTransport(EmailTransport):
+    """Keeps sent emails in ``MemoryTransport.outbox``, for tests and offline load tests."""
+
+    outbox: list[OutgoingEmail] = []
+
+    def send(self, email: OutgoingEmail) -> None:
+        self.outbox.append(email)
+
+
+class FileTransport(EmailTransport):
+    """Appends sent emails as JSON lines to ``EMAIL_FILE_PATH``, for local runs and benchmarks."""
+
+    def __init__(self):
+        self.path = Path(settings.EMAIL_FILE_PATH)
+        self.lock = threading.Lock()
+
+    def send(self, email: OutgoingEmail) -> None:
+        with self.lock, self.path.open('a', encoding='utf-8') as file:
+            file.write(json.dumps(email._asdict()) + '\n')
+
+
+@functools.cache
+def get_email_transport() -> EmailTransport:
+    """The process-wide transport named by ``settings.EMAIL_TRANSPORT``."""
+    return import_string(settings.EMAIL_TRANSPORT)()
+
+
+@receiver(setting_changed)
+def reset_email_transport(setting, **_kwargs):
+    if setting in {'EMAIL_TRANSPORT', 'PLUNK_TRANSPORT', 'EMAIL_FILE_PATH'}:
+        get_email_transport.cache_clear()
@@ -0,0 +1,53 @@
+import logging
+
+from django.db import connection
+from django.conf import settings
+
+from .exceptions import QueryBudgetExceededError
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook counting the SQL statements run through it."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    """
+    Enforce the ``query_budget`` declared on a view class.
+
+    Every statement run while handling the request is counted, authentication included. Going over
+    budget raises when ``QUERY_BUDGET_RAISE`` is on (dev and tests) and logs a warning otherwise.
+    A budget given as a dict maps database vendors to budgets; other vendors are not checked.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and counter.count > budget:
+            msg = f'{request.method} {request.path} ran {counter.count} queries, budget is {budget}'
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceededError(msg)
+            logger.warning(msg)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+        if isinstance(budget, dict):
+            budget = budget.get(connection.vendor)
+        request.query_budget = budget
@@ -1,7 +1,137 @@
+import json
+import base64
+import binascii
+
+from django.db.models import Q, Model
+from django.core.exceptions import ValidationError
+
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 
+from .responses import success_response
+
 
 class CustomPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 50
+
+    def get_pagination_data(self) -> dict:
+        return {
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+
+    def get_paginated_response(self, data):
+        return success_response(data, pagination=self.get_pagination_data())
+
+
+class KeysetPagination(CustomPagination):
+    """
+    Page-number pagination with an additional keyset (cursor) mode.
+
+    The view's ``ordering`` must end in a unique field. Passing ``?cursor=`` (empty for the first
+    page) filters on the last seen ordering key instead of using OFFSET, so deep pages cost the
+    same as the first one. Page-number responses also carry cursors so clients can switch over.
+    """
+
+    cursor_query_param = 'cursor'
+    cursor_required = False
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'ordering', None) or self.ordering)
+        queryset = queryset.order_by(*self.ordering)
+
+        self.cursor_mode = self.cursor_required or self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            self.rows = super().paginate_queryset(queryset, request, view)
+            self.has_next = self.page.has_next()
+            self.has_previous = self.page.has_previous()
+            return self.rows
+
+        cursor = self.decode_cursor(request.query_params.get(self.cursor_query_param, ''), queryset.model)
+        page_size = self.get_page_size(request)
+        values, reverse = cursor or (None, False)
+
+        ordering = tuple(self.invert(field) for field in self.ordering) if reverse else self.ordering
+        if values is not None:
+            queryset = queryset.order_by(*ordering).filter(self.get_key_filter(ordering, values))
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.rows = rows
+        return rows
+
+    def get_pagination_data(self) -> dict:
+        next_cursor = self.encode_cursor(self.rows[-1], reverse=False) if self.rows and self.has_next else None
+        previous_cursor = self.encode_cursor(self.rows[0], reverse=True) if self.rows and self.has_previous else None
+
+        pagination = {} if self.cursor_mode else super().get_pagination_data()
+        pagination.update(next_cursor=next_cursor, previous_cursor=previous_cursor)
+        return pagination
+
+    @staticmethod
+    def invert(field: str) -> str:
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def get_key_filter(ordering: tuple[str, ...], values: list) -> Q:
+        """Build ``key > values`` in ``ordering`` order, led by a bound on the first field for index use."""
+        names = [field.lstrip('-') for field in ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in ordering]
+
+        after = Q()
+        for position, (name, lookup) in enumerate(zip(names, lookups, strict=True)):
+            ties = dict(zip(names[:position], values[:position], strict=True))
+            after |= Q(**ties, **{f'{name}__{lookup}': values[position]})
+
+        return Q(**{f'{names[0]}__{lookups[0]}e': values[0]}) & after
+
+    def encode_cursor(self, row, *, reverse: bool) -> str:
+        values = [getattr(row, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, encoded: str, model: type[Model]) -> tuple[list, bool] | None:
+        """Decode a cursor, converting its values with the ordering fields so bad input is a 404, not a 500."""
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)  # noqa: SLF001
+                for field, value in zip(self.ordering, values, strict=True)
+            ]
+        except (ValidationError, ValueError, TypeError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+
+class FeedPagination(KeysetPagination):
+    """Keyset-only pagination for feeds: no COUNT and no OFFSET, the first page needs no cursor."""
+
+    cursor_required = True
@@ -1,15 +1,49 @@
+import hashlib
 from typing import Any
+from collections.abc import Callable
+
+from django.db import models
+from django.http import HttpResponseBase
+from django.utils.cache import patch_cache_control, get_conditional_response
 
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 from rest_framework.response import Response
 
 
-def success_response(data: Any, status_code: int = HTTP_200_OK) -> Response:
-    """Generate a success response with the provided data and status code."""
-    return Response({'success': True, 'data': data}, status=status_code)
+def success_response(data: Any, status_code: int = HTTP_200_OK, pagination: dict | None = None) -> Response:
+    """Generate a success response with the provided data, status code and optional pagination details."""
+    response_data = {'success': True, 'data': data}
+    if pagination is not None:
+        response_data['pagination'] = pagination
+    return Response(response_data, status=status_code)
 
 
 def error_response(error: Any, status_code: int = HTTP_400_BAD_REQUEST) -> Response:
     """Generate an error response with the provided message, error, and status code."""
     error_data = {'error': error, 'success': False}
     return Response(error_data, status=status_code)
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak ETag over plain values and model instances, hashing the column values each instance loaded."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for part in parts:
+        if isinstance(part, models.Model):
+            values = sorted((name, value) for name, value in vars(part).items() if not name.startswith('_'))
+        else:
+            values = part
+        digest.update(repr(values).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def conditional_response(request, etag: str, render: Callable[[], Response]) -> HttpResponseBase:
+    """
+    Answer 304 Not Modified when the request's If-None-Match still matches ``etag``, else ``render()``.
+
+    Build ``etag`` from the rows the response is made of so unchanged resources skip serialization.
+    Responses are marked ``no-cache`` so clients revalidate with the ETag instead of refetching.
+    """
+    response = get_conditional_response(request, etag=etag) or render()
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,73 @@
+import time
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.throttling import BaseThrottle
+
+from common.caching import get_redis_client
+
+# Sliding-window log per key (a sorted set of request times in ms). ARGV[1] is now, then a
+# (limit, window ms) pair per key, then the member to record. Every window is trimmed and checked
+# first; the request is recorded in all of them only if none is full. Returns the ms to wait, or 0.
+SLIDING_WINDOW_SCRIPT = '''
+local now = tonumber(ARGV[1])
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local limit, window = tonumber(ARGV[i * 2]), tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        wait = math.max(wait, tonumber(oldest[2]) + window - now)
+    end
+end
+if wait > 0 then
+    return wait
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[#KEYS * 2 + 2])
+    redis.call('PEXPIRE', key, ARGV[i * 2 + 1])
+end
+return 0
+'''
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Per-email and per-client-IP sliding-window limits for the view's ``throttle_scope``.
+
+    ``settings.OTP_RATE_LIMITS[scope]`` maps ``EMAIL`` and ``IP`` to ``(requests, seconds)``. Both
+    windows are checked and updated atomically in one Redis round trip, and only allowed requests
+    count against them. Views without a ``throttle_scope`` are not limited.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def allow_request(self, request, view) -> bool:
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return True
+
+        limits = settings.OTP_RATE_LIMITS[scope]
+        idents = {'IP': self.get_ident(request)}
+        email = request.data.get('email') if isinstance(request.data, dict) else None
+        if isinstance(email, str) and email.strip():
+            idents['EMAIL'] = email.strip().lower()
+
+        keys, args = [], []
+        for name, ident in idents.items():
+            limit, window = limits[name]
+            keys.append(cache.make_key(f'throttle:{scope}:{name.lower()}:{ident}'))
+            args.extend([limit, window * 1000])
+
+        now = int(time.time() * 1000)
+        member = f'{now}-{secrets.token_hex(4)}'
+        client = get_redis_client('OTP rate limiting')
+        wait = client.eval(SLIDING_WINDOW_SCRIPT, len(keys), *keys, now, *args, member)
+        self.wait_seconds = wait / 1000 if wait else None
+        return not wait
+
+    def wait(self) -> float | None:
+        return self.wait_seconds
@@ -8,10 +8,19 @@ DEBUG = env.bool('DEBUG')
 
 SECRET_KEY = env.str('BACKEND_SECRET_KEY')
 
-DATABASES = {'default': env.dj_db_url('BACKEND_DATABASE_URL')}
+# The database is remote, so keep connections open across requests
+DATABASE_OPTIONS = {**DATABASE_OPTIONS, 'conn_max_age': env.int('DB_CONN_MAX_AGE', 600)}  # noqa: F405
+DATABASES = {'default': env.dj_db_url('BACKEND_DATABASE_URL', **DATABASE_OPTIONS)}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['ENGINE'] = 'common.db.postgresql'
 
 CACHES = {'default': env.dj_cache_url('CACHE_URL')}
 
+# fly.io's proxy appends the client address to X-Forwarded-For
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'NUM_PROXIES': env.int('NUM_PROXIES', 1)}  # noqa: F405
+
+QUERY_BUDGET_RAISE = env.bool('QUERY_BUDGET_RAISE', False)
+
 ALLOWED_HOSTS = ['*']
 
 # ALLOWED_HOSTS = ['localhost', '127.0.0.1', '.fly.dev']
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'company_x_backend.settings.prod')
 
 application = get_wsgi_application()
+
+# Build per-worker in-memory indexes before the first request
+from business.autocomplete import company_autocomplete  # noqa: E402
+
+company_autocomplete.warm()
@@ -0,0 +1,127 @@
+import math
+import time
+import logging
+import secrets
+import statistics
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import models, transaction
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from common.mail import OutgoingEmail, get_email_transport
+from users.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver queued OutboxEmail rows concurrently through the EMAIL_TRANSPORT, retrying failures with '
+        'exponential backoff, and purge delivered and failed rows past their retention.'
+    )
+
+    def add_arguments(self, parser):
+        config = settings.EMAIL_OUTBOX
+        parser.add_argument('--workers', type=int, default=config['WORKERS'], help='concurrent sends')
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'], help='emails claimed per poll')
+        parser.add_argument('--once', action='store_true', help='exit once no email is due instead of polling')
+
+    def handle(self, *args, **options):
+        self.transport = get_email_transport()
+        next_purge = 0.0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                if time.monotonic() >= next_purge:
+                    self.purge()
+                    next_purge = time.monotonic() + settings.EMAIL_OUTBOX['PURGE_INTERVAL']
+
+                emails = self.claim(options['batch_size'])
+                if emails:
+                    chunks = self.split(emails, options['workers'])
+                    self.record([email for chunk in executor.map(self.deliver, chunks) for email in chunk])
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(settings.EMAIL_OUTBOX['POLL_INTERVAL'])
+
+    def claim(self, batch_size: int) -> list[OutboxEmail]:
+        """
+        Take up to ``batch_size`` due emails, skipping rows other workers hold.
+
+        Claimed rows are pushed ``LEASE`` seconds into the future before the lock is released, so a
+        worker that dies mid-send only delays them; they are retried once the lease runs out.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+                .order_by('next_attempt_at')[:batch_size]
+            )
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                attempts=models.F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX['LEASE']),
+            )
+
+        for email in emails:
+            email.attempts += 1
+        return emails
+
+    @staticmethod
+    def split(emails: list[OutboxEmail], workers: int) -> list[list[OutboxEmail]]:
+        """One chunk per worker, keeping identical emails together so the transport can batch them."""
+        emails = sorted(emails, key=lambda email: (email.subject, email.html))
+        size = math.ceil(len(emails) / workers)
+        return [emails[start:start + size] for start in range(0, len(emails), size)]
+
+    def deliver(self, emails: list[OutboxEmail]) -> list[OutboxEmail]:
+        """Send a chunk of emails (runs in a pool thread, so it must not touch the database)."""
+        errors = self.transport.send_many([OutgoingEmail(email.to, email.subject, email.html) for email in emails])
+        for email, error in zip(emails, errors, strict=True):
+            if error is not None:
+                email.last_error = str(error)[:1000]
+                if email.attempts >= settings.EMAIL_OUTBOX['MAX_ATTEMPTS']:
+                    email.status = OutboxEmail.Status.FAILED
+                else:
+                    email.next_attempt_at = timezone.now() + self.backoff(email.attempts)
+            else:
+                email.status = OutboxEmail.Status.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                # The body may hold a one-time code; only the metadata is kept once it is delivered
+                email.html = ''
+        return emails
+
+    @staticmethod
+    def backoff(attempts: int) -> timedelta:
+        """``BACKOFF_BASE`` doubled per failed attempt, capped at ``BACKOFF_MAX``, plus up to 50% jitter."""
+        delay = min(settings.EMAIL_OUTBOX['BACKOFF_BASE'] * 2 ** (attempts - 1), settings.EMAIL_OUTBOX['BACKOFF_MAX'])
+        return timedelta(seconds=delay + secrets.randbelow(delay // 2 + 1))
+
+    def record(self, emails: list[OutboxEmail]) -> None:
+        OutboxEmail.objects.bulk_update(emails, ['status', 'html', 'sent_at', 'next_attempt_at', 'last_error'])
+
+        latencies = [email.delivery_latency.total_seconds() for email in emails if email.sent_at]
+        failed = sum(email.status == OutboxEmail.Status.FAILED for email in emails)
+        retrying = len(emails) - len(latencies) - failed
+        message = f'Delivered {len(latencies)} emails, {retrying} to retry, {failed} failed'
+        if latencies:
+            message += f'; latency p50 {statistics.median(latencies):.2f}s, max {max(latencies):.2f}s'
+
+        logger.info(message)
+        self.stdout.write(message)
+
+    def purge(self) -> int:
+        """Delete sent and failed emails queued more than ``RETENTION_DAYS`` ago. Returns the rows deleted."""
+        cutoff = timezone.now() - timedelta(days=settings.EMAIL_OUTBOX['RETENTION_DAYS'])
+        deleted, _ = OutboxEmail.objects.filter(
+            status__in=[OutboxEmail.Status.SENT, OutboxEmail.Status.FAILED], created_at__lt=cutoff
+        ).delete()
+        if deleted:
+            message = f'Purged {deleted} emails older than {settings.EMAIL_OUTBOX["RETENTION_DAYS"]} days'
+            logger.info(message)
+            self.stdout.write(message)
+        return deleted
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.models import Review, like_count_buffer
+
+
+class Command(BaseCommand):
+    help = 'Fold like counts buffered in the Redis cache (LIKE_WRITE_BEHIND) into Review.like_count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.LIKE_WRITE_BEHIND['FLUSH_BATCH_SIZE'],
+            help='reviews updated per statement',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0, help='keep running, flushing every INTERVAL seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            flushed = like_count_buffer.flush(Review, 'like_count', options['batch_size'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f'Flushed like counts for {flushed} reviews in {elapsed:.3f}s'))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
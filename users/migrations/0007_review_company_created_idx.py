@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_alter_review_id_alter_user_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['company', 'created_at', 'id'], name='review_company_created_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:15
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    return Coalesce(
+        models.Subquery(
+            model.objects.filter(**{field: models.OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=models.Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Review = apps.get_model('users', 'Review')
+    ReviewLikes = apps.get_model('users', 'ReviewLikes')
+    ReviewFlags = apps.get_model('users', 'ReviewFlags')
+
+    User.objects.update(review_count=count_of(Review, 'user'))
+    Review.objects.update(like_count=count_of(ReviewLikes, 'review'), flag_count=count_of(ReviewFlags, 'review'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_review_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='flag_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_company_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_created_idx',
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='status',
+            field=models.CharField(choices=[('published', 'Published'), ('hidden', 'Hidden')], default='published', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['company', 'status', 'created_at', 'id'], name='review_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'status', 'created_at', 'id'], name='review_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='review_created_idx'),
+        ),
+    ]
@@ -1,9 +1,28 @@
+from collections import Counter
+from collections.abc import Callable
+
 import shortuuid
 
-from django.db import models
+from django.db import models, connections, transaction
+from django.conf import settings
+from django.utils import timezone
+from django.dispatch import receiver
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models.signals import post_delete
+from django.db.models.functions import Greatest
+
+from common.caching import TieredCache
+from business.models import RATING_AGGREGATE_FIELDS, Company, CategoryFacet
+from common.counters import CounterBuffer
+
+like_count_buffer = CounterBuffer('review-like-count', 'LIKE_WRITE_BEHIND')
+# Users as loaded by JWTAuthentication, keyed by id (see AUTH_USER_CACHE)
+user_cache = TieredCache('auth-user', 'AUTH_USER_CACHE')
 
-from business.models import Company
+
+def adjust_counter(model: type[models.Model], pk, field: str, delta: int) -> None:
+    """Atomically add ``delta`` to a denormalized counter column, never going below zero."""
+    model.objects.filter(pk=pk).update(**{field: Greatest(models.F(field) + delta, 0)})
 
 
 class User(models.Model):
@@ -15,22 +34,160 @@ class User(models.Model):
     language = models.CharField(max_length=50)
     created_at = models.DateTimeField(auto_now_add=True)
     is_verified = models.BooleanField(default=False)
+    review_count = models.PositiveIntegerField(default=0)
+    # Embedded in issued tokens as `ver`; bumping it revokes every token issued before
+    token_version = models.PositiveIntegerField(default=0)
 
     # TODO: maybe pictures or not
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        transaction.on_commit(lambda pk=self.pk: user_cache.delete(pk))
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(lambda: user_cache.delete(pk))
+        return result
+
     @property
     def number_of_reviews(self):
-        return self.reviews.count()
+        return self.review_count
 
     @property
     def is_authenticated(self):
         return True
 
+    def revoke_tokens(self) -> None:
+        """Invalidate every access and refresh token issued to this user so far."""
+        self.token_version = models.F('token_version') + 1
+        self.save(update_fields=['token_version'])
+        self.refresh_from_db(fields=['token_version'])
+
+    @classmethod
+    def get_cached(cls, pk: str) -> 'User | None':
+        """
+        The user with ``pk`` through ``user_cache``, or ``None``.
+
+        ``review_count`` is deferred: it changes with every review and must not be served stale, and a
+        later ``save()`` of the cached instance then only writes the fields that were loaded.
+        """
+        return user_cache.get(pk, lambda: cls.objects.defer('review_count').filter(pk=pk).first())
+
+
+class MissingCompaniesError(Exception):
+    """Raised by a bulk review write when companies it references were deleted after validation."""
+
+    def __init__(self, company_ids: set[str]):
+        self.company_ids = company_ids
+        super().__init__(f'Companies no longer exist: {", ".join(sorted(company_ids))}')
+
+
+class ReviewQuerySet(models.QuerySet):
+    def published(self) -> 'ReviewQuerySet':
+        """Reviews that may appear in listings."""
+        return self.filter(status=Review.Status.PUBLISHED)
+
+    def moderate(self) -> int:
+        """
+        Apply the ``REVIEW_MODERATION`` limits to the reviews in this queryset, one at a time.
+
+        Meant to run against a single review on every flag write: a published review is hidden once
+        it has ``HIDE_FLAG_COUNT`` flags, or ``MIN_FLAGS_FOR_RATIO`` flags making up ``HIDE_FLAG_RATIO``
+        of its likes and flags together, and a hidden one is published again once it no longer does.
+        Likes still pending in ``like_count_buffer`` count towards the ratio. Each change moves the
+        review out of (or back into) the aggregates under its company lock. Returns the reviews changed.
+        """
+        limits = settings.REVIEW_MODERATION
+        pending_likes = models.Value(0)
+        if like_count_buffer.enabled:
+            pending = like_count_buffer.pending(list(self.values_list('pk', flat=True)))
+            pending_likes = models.Case(
+                *[models.When(pk=pk, then=models.Value(delta)) for pk, delta in pending.items()],
+                default=models.Value(0),
+            )
+        reactions = models.F('flag_count') + models.F('like_count') + pending_likes
+        over_ratio = models.Q(flag_count__gte=limits['MIN_FLAGS_FOR_RATIO']) & models.Q(
+            flag_count__gte=reactions * limits['HIDE_FLAG_RATIO']
+        )
+        over_limit = models.Q(flag_count__gte=limits['HIDE_FLAG_COUNT']) | over_ratio
+
+        published, hidden = Review.Status.PUBLISHED, Review.Status.HIDDEN
+        changing = (models.Q(status=published) & over_limit) | (models.Q(status=hidden) & ~over_limit)
+        changed = 0
+        for review in self.filter(changing).only('pk', 'company_id', 'user_id', 'created_at'):
+            with transaction.atomic(using=self.db):
+                company = Company.objects.select_for_update(no_key=True).get(pk=review.company_id)
+                rows = Review.objects.filter(pk=review.pk)
+                # Checked again as the row is written, since flags do not take the company lock
+                if rows.filter(over_limit, status=published).update(status=hidden):
+                    old_status, new_status = published, hidden
+                elif rows.filter(status=hidden).exclude(over_limit).update(status=published):
+                    old_status, new_status = hidden, published
+                else:
+                    continue
+
+                rating = rows.values_list('rating', flat=True).get()
+                review.move_aggregates(company, (rating, old_status), (rating, new_status))
+                changed += 1
+
+        return changed
+
+    def bulk_create_with_aggregates(
+        self, reviews: list['Review'], batch_size: int = 500, insert: Callable | None = None
+    ) -> list['Review']:
+        """
+        ``bulk_create`` new reviews ``batch_size`` at a time, keeping the denormalized counters exact.
+
+        Each batch locks its companies (in pk order, as ``Review.save`` locks one), inserts the rows,
+        then writes each company aggregate, category facet and author count once for the whole batch
+        (only published reviews count towards them).
+        ``insert`` replaces ``bulk_create`` for a batch (e.g. with COPY); it must set ``created_at``.
+        Raises ``MissingCompaniesError`` if a batch's companies were deleted since they were validated.
+        """
+        insert = insert or self.bulk_create
+        for start in range(0, len(reviews), batch_size):
+            batch = reviews[start:start + batch_size]
+            with transaction.atomic():
+                companies = {
+                    company.pk: company
+                    for company in Company.objects.select_for_update(no_key=True)
+                    .filter(pk__in={review.company_id for review in batch})
+                    .order_by('pk')
+                    .only('pk', 'category', 'subcategory', *RATING_AGGREGATE_FIELDS)
+                }
+                missing = {review.company_id for review in batch} - companies.keys()
+                if missing:
+                    raise MissingCompaniesError(missing)
+                insert(batch)
+
+                facets = Counter()
+                authors = Counter()
+                for review in batch:
+                    if review.status != Review.Status.PUBLISHED:
+                        continue
+                    company = companies[review.company_id]
+                    company.add_rating(int(review.rating), review.created_at)
+                    facets[company.category, company.subcategory] += 1
+                    authors[review.user_id] += 1
+
+                Company.objects.bulk_update(companies.values(), RATING_AGGREGATE_FIELDS)
+                for (category, subcategory), count in facets.items():
+                    CategoryFacet.adjust(category, subcategory, reviews=count)
+                for user_id, count in authors.items():
+                    adjust_counter(User, user_id, 'review_count', count)
+
+        return reviews
+
 
 class Review(models.Model):
+    class Status(models.TextChoices):
+        PUBLISHED = 'published'
+        HIDDEN = 'hidden'
+
     id = models.CharField(max_length=27, unique=True, primary_key=True, default=shortuuid.uuid)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
@@ -40,30 +197,349 @@ class Review(models.Model):
     review_body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    like_count = models.PositiveIntegerField(default=0)
+    flag_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PUBLISHED)
+
+    objects = ReviewQuerySet.as_manager()
+
+    class Meta:
+        # Listings filter on status, so it sits between the equality columns and the keyset ordering
+        indexes = [
+            models.Index(fields=['company', 'status', 'created_at', 'id'], name='review_company_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at', 'id'], name='review_user_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='review_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.name}'s review of {self.company.company_name}"
 
+    def save(self, *args, **kwargs) -> None:
+        if not self._state.adding:
+            return self.save_edit(*args, **kwargs)
+        if self.status != Review.Status.PUBLISHED:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            company = Company.objects.select_for_update(no_key=True).get(pk=self.company_id)
+            super().save(*args, **kwargs)
+            company.add_rating(int(self.rating), self.created_at)
+            company.save(update_fields=RATING_AGGREGATE_FIELDS)
+            CategoryFacet.adjust(company.category, company.subcategory, reviews=1)
+            adjust_counter(User, self.user_id, 'review_count', 1)
+
+        if Review.user.is_cached(self):
+            self.user.refresh_from_db(fields=['review_count'])
+        return None
+
+    def save_edit(self, *args, **kwargs) -> None:
+        """Save an existing review, moving the aggregates from its stored rating and status to the new ones."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'rating', 'status'} & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            company = Company.objects.select_for_update(no_key=True).get(pk=self.company_id)
+            rows = Review.objects.filter(pk=self.pk)
+            old = rows.values_list('rating', 'status').first()
+            super().save(*args, **kwargs)
+            if old is not None:
+                self.move_aggregates(company, old, rows.values_list('rating', 'status').get())
+        return None
+
+    def move_aggregates(self, company: Company, old: tuple[int, str], new: tuple[int, str]) -> None:
+        """
+        Move the review's company aggregate, category facet and author count from its ``old``
+        ``(rating, status)`` to the ``new`` one, once the row is saved and with ``company`` locked.
+        Only published reviews count towards them.
+        """
+        (old_rating, old_status), (new_rating, new_status) = old, new
+        counted, was_counted = new_status == Review.Status.PUBLISHED, old_status == Review.Status.PUBLISHED
+        if counted and was_counted:
+            if old_rating == new_rating:
+                return
+            company.change_rating(old_rating, new_rating)
+        elif was_counted:
+            company.remove_rating(old_rating, self.created_at)
+        elif counted:
+            company.add_rating(new_rating, self.created_at)
+        else:
+            return
+
+        company.save(update_fields=RATING_AGGREGATE_FIELDS)
+        if counted != was_counted:
+            delta = 1 if counted else -1
+            CategoryFacet.adjust(company.category, company.subcategory, reviews=delta)
+            adjust_counter(User, self.user_id, 'review_count', delta)
+
     @property
     def number_of_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     @property
     def number_of_flags(self):
-        return self.flags.count()
+        return self.flag_count
+
+
+@receiver(post_delete, sender=Review)
+def remove_deleted_review(instance: Review, origin=None, **_kwargs) -> None:
+    """
+    Take a deleted review out of the denormalized counters.
+
+    A signal rather than ``Review.delete`` so queryset deletes and cascades (deleting a user or a
+    company) are counted as well; it runs inside the deletion's transaction. A company deleted
+    along with its reviews takes its own facet counts with it in ``Company.delete``. Hidden reviews
+    were already taken out when they were hidden.
+    """
+    if instance.status != Review.Status.PUBLISHED:
+        return
+    if not (isinstance(origin, Company) and origin.pk == instance.company_id):
+        company = Company.objects.select_for_update(no_key=True).filter(pk=instance.company_id).first()
+        if company is not None:
+            company.remove_rating(instance.rating, instance.created_at)
+            company.save(update_fields=RATING_AGGREGATE_FIELDS)
+            CategoryFacet.adjust(company.category, company.subcategory, reviews=-1)
+    adjust_counter(User, instance.user_id, 'review_count', -1)
+
+
+ADD_REACTION_SQL = '''
+WITH inserted AS (
+    INSERT INTO {reaction} (user_id, review_id, created_at)
+    SELECT %s, id, %s FROM {review} WHERE id = %s
+    ON CONFLICT (review_id, user_id) DO NOTHING
+    RETURNING 1
+)
+UPDATE {review} SET {counter} = {counter} + (SELECT count(*) FROM inserted) WHERE id = %s
+RETURNING {counter}
+'''
+
+REMOVE_REACTION_SQL = '''
+WITH deleted AS (
+    DELETE FROM {reaction} WHERE review_id = %s AND user_id = %s
+    RETURNING 1
+)
+UPDATE {review} SET {counter} = GREATEST({counter} - (SELECT count(*) FROM deleted), 0) WHERE id = %s
+RETURNING {counter}
+'''
+
+# Write-behind variants: the counter is left alone and the row change is returned as a delta
+BUFFERED_ADD_REACTION_SQL = '''
+WITH inserted AS (
+    INSERT INTO {reaction} (user_id, review_id, created_at)
+    SELECT %s, id, %s FROM {review} WHERE id = %s
+    ON CONFLICT (review_id, user_id) DO NOTHING
+    RETURNING 1
+)
+SELECT {counter}, (SELECT count(*) FROM inserted) FROM {review} WHERE id = %s
+'''
+
+BUFFERED_REMOVE_REACTION_SQL = '''
+WITH deleted AS (
+    DELETE FROM {reaction} WHERE review_id = %s AND user_id = %s
+    RETURNING 1
+)
+SELECT {counter}, -(SELECT count(*) FROM deleted) FROM {review} WHERE id = %s
+'''
+
+
+class ReviewReactionManager(models.Manager):
+    """
+    Idempotent add/remove of a user's reaction (like, flag) to a review.
+
+    On PostgreSQL each call is one statement: a conflict-tolerant INSERT (or a DELETE) chained to
+    the counter UPDATE on ``Review``, so there is no read-before-write and double taps cannot race
+    into the unique constraint. Both return the review's new counter, or None if it does not exist.
+
+    When the model's ``counter_buffer`` is enabled the counter row is not touched at all: the change
+    goes to the Redis buffer and the returned count includes whatever is still pending there.
+    """
+
+    def add(self, user_id: str, review_id: str) -> int | None:
+        if connections[self.db].vendor == 'postgresql':
+            params = [user_id, timezone.now(), review_id, review_id]
+            if self._buffered():
+                return self._changed(self._execute_buffered(BUFFERED_ADD_REACTION_SQL, params, review_id), review_id)
+            return self._changed(self._execute(ADD_REACTION_SQL, params), review_id)
+
+        with transaction.atomic(using=self.db):
+            if not Review.objects.filter(pk=review_id).exists():
+                return None
+            self.get_or_create(user_id=user_id, review_id=review_id)
+            return self._counter(review_id)
+
+    def remove(self, user_id: str, review_id: str) -> int | None:
+        if connections[self.db].vendor == 'postgresql':
+            params = [review_id, user_id, review_id]
+            if self._buffered():
+                return self._changed(self._execute_buffered(BUFFERED_REMOVE_REACTION_SQL, params, review_id), review_id)
+            return self._changed(self._execute(REMOVE_REACTION_SQL, params), review_id)
+
+        with transaction.atomic(using=self.db):
+            reaction = self.filter(user_id=user_id, review_id=review_id).first()
+            if reaction is not None:
+                reaction.delete()
+            return self._counter(review_id)
+
+    def _changed(self, count: int | None, review_id: str) -> int | None:
+        # The statements bypass the model, so run its hook here; the fallback path goes through save/delete
+        if count is not None:
+            self.model.counter_changed(review_id)
+        return count
+
+    def _buffered(self) -> bool:
+        return self.model.counter_buffer is not None and self.model.counter_buffer.enabled
+
+    def _execute(self, sql: str, params: list) -> int | None:
+        row = self._fetch(sql, params)
+        return row[0] if row else None
+
+    def _execute_buffered(self, sql: str, params: list, review_id: str) -> int | None:
+        row = self._fetch(sql, params)
+        if row is None:
+            return None
+
+        stored, delta = row
+        return self.model.counter_buffer.merge(review_id, stored, delta)
+
+    def _fetch(self, sql: str, params: list) -> tuple | None:
+        connection = connections[self.db]
+        sql = sql.format(
+            reaction=connection.ops.quote_name(self.model._meta.db_table),  # noqa: SLF001
+            review=connection.ops.quote_name(Review._meta.db_table),  # noqa: SLF001
+            counter=connection.ops.quote_name(self.model.counter_field),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+    def _counter(self, review_id: str) -> int | None:
+        return Review.objects.filter(pk=review_id).values_list(self.model.counter_field, flat=True).first()
+
+
+class ReviewReaction(models.Model):
+    """A user's reaction to a review, counted in the review's ``counter_field``."""
 
-class ReviewLikes(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='likes')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewReactionManager()
+    counter_field: str
+    counter_buffer: CounterBuffer | None = None
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs) -> None:
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            adjust_counter(Review, self.review_id, self.counter_field, 1)
+        # After the counter's transaction, so the hook does not hold the review row while it locks more
+        self.counter_changed(self.review_id)
+        self.refresh_counter()
+        return None
+
+    def delete(self, *args, **kwargs):
+        # The counter is adjusted by remove_deleted_reaction, which also covers cascades
+        deleted = super().delete(*args, **kwargs)
+        self.refresh_counter()
+        return deleted
+
+    def refresh_counter(self) -> None:
+        """Reload the counter on the review if that is loaded, as ``Review.save`` does for the author."""
+        if type(self).review.is_cached(self):
+            self.review.refresh_from_db(fields=[self.counter_field])
+
+    @classmethod
+    def counter_changed(cls, review_id: str) -> None:
+        """Called once a reaction to ``review_id`` has been added or removed and committed."""
+
+
+class ReviewLikes(ReviewReaction):
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='likes')
+
+    counter_field = 'like_count'
+    counter_buffer = like_count_buffer
+
     class Meta:
         unique_together = ('review', 'user')
 
-class ReviewFlags(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+class ReviewFlags(ReviewReaction):
     review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='flags')
-    created_at = models.DateTimeField(auto_now_add=True)
+
+    counter_field = 'flag_count'
 
     class Meta:
         unique_together = ('review', 'user')
+
+    @classmethod
+    def counter_changed(cls, review_id: str) -> None:
+        """Re-check only that review against the auto-hide limits, hiding or publishing it again."""
+        Review.objects.filter(pk=review_id).moderate()
+
+
+@receiver(post_delete, sender=ReviewLikes)
+@receiver(post_delete, sender=ReviewFlags)
+def remove_deleted_reaction(sender, instance: ReviewReaction, origin=None, **_kwargs) -> None:
+    """
+    Take a deleted like or flag off its review's counter, for queryset deletes and cascades too.
+
+    Skipped when the review itself is being deleted. While the write-behind buffer is on, the
+    decrement is buffered once the deletion commits, as increments may still be pending there.
+    ``counter_changed`` runs after the commit as well, outside the deletion's locks.
+    """
+    if isinstance(origin, Review) and origin.pk == instance.review_id:
+        return
+
+    buffer = sender.counter_buffer
+    if buffer is not None and buffer.enabled:
+        transaction.on_commit(lambda: buffer.add(instance.review_id, -1))
+    else:
+        adjust_counter(Review, instance.review_id, sender.counter_field, -1)
+    transaction.on_commit(lambda: sender.counter_changed(instance.review_id))
+
+
+class OutboxEmail(models.Model):
+    """An email queued during a request and delivered later by the `deliver_emails` worker."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        SENT = 'sent'
+        FAILED = 'failed'
+
+    id = models.CharField(max_length=27, unique=True, primary_key=True, default=shortuuid.uuid)
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=200)
+    html = models.TextField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='outbox_email_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} to {self.to} ({self.status})'
+
+    @classmethod
+    def queue(cls, to: str, subject: str, html: str) -> 'OutboxEmail':
+        """Queue an email for the delivery worker; a single INSERT, so the request never waits on the provider."""
+        return cls.objects.create(to=to, subject=subject, html=html)
+
+    @property
+    def delivery_latency(self):
+        """Time from queueing to delivery, once sent."""
+        return self.sent_at - self.created_at if self.sent_at else None
@@ -14,6 +14,10 @@ class LoginWithOTPSerializer(serializers.Serializer):
     otp = serializers.CharField(max_length=4)
 
 
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh_token = serializers.CharField()
+
+
 class UserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(validators=[UniqueValidator(queryset=User.objects.all())])
 
@@ -45,8 +49,6 @@ class UserSerializer(serializers.ModelSerializer):
 
 class ReviewSerializer(serializers.ModelSerializer):
     company = serializers.PrimaryKeyRelatedField(queryset=Company.objects.all(), many=False)
-    like_count = serializers.IntegerField(source='likes.count', read_only=True)
-    flag_count = serializers.IntegerField(source='flags.count', read_only=True)
 
     class Meta:
         model = Review
@@ -65,6 +67,8 @@ class ReviewSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'id': {'read_only': True},
             'user': {'read_only': True},
+            'like_count': {'read_only': True},
+            'flag_count': {'read_only': True},
             'created_at': {'read_only': True},
             'updated_at': {'read_only': True},
         }
@@ -86,7 +90,7 @@ class ReviewSerializer(serializers.ModelSerializer):
             'user_id': instance.user.id,
             'name': instance.user.name,
             'country': instance.user.country,
-            'number_of_reviews': instance.user.number_of_reviews,
+            'number_of_reviews': instance.user.review_count,
         }
         representation['company'] = {
             'company_name': instance.company.company_name,
@@ -95,6 +99,16 @@ class ReviewSerializer(serializers.ModelSerializer):
         return representation
 
 
+class BulkReviewSerializer(serializers.ModelSerializer):
+    """One item of a bulk submission; companies are resolved for the whole list at once by the view."""
+
+    company = serializers.CharField(max_length=27)
+
+    class Meta:
+        model = Review
+        fields = ['company', 'rating', 'title', 'review_body']
+
+
 class ReviewLikesSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReviewLikes
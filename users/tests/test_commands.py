@@ -0,0 +1,92 @@
+from io import StringIO
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.core.management import call_command
+
+from common.mail import MemoryTransport
+from users.models import OutboxEmail
+from common.exceptions import EmailTransportError
+
+EMAIL_OUTBOX = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 10,
+    'POLL_INTERVAL': 0,
+    'LEASE': 120,
+    'MAX_ATTEMPTS': 2,
+    'BACKOFF_BASE': 10,
+    'BACKOFF_MAX': 3600,
+    'RETENTION_DAYS': 7,
+    'PURGE_INTERVAL': 3600,
+}
+
+
+class FlakyTransport(MemoryTransport):
+    def send(self, email):
+        if email.to == 'flaky@gmail.com':
+            msg = 'Plunk is down'
+            raise EmailTransportError(msg)
+        super().send(email)
+
+
+@override_settings(EMAIL_OUTBOX=EMAIL_OUTBOX, EMAIL_TRANSPORT='users.tests.test_commands.FlakyTransport')
+class TestDeliverEmailsCommand(TestCase):
+    def setUp(self):
+        MemoryTransport.outbox.clear()
+        self.welcome = OutboxEmail.queue('ok@gmail.com', 'Welcome', '<p>Hi</p>')
+        self.flaky = OutboxEmail.queue('flaky@gmail.com', 'Welcome', '<p>Hi</p>')
+
+    def deliver(self, **options):
+        out = StringIO()
+        call_command('deliver_emails', once=True, stdout=out, **options)
+        return out.getvalue()
+
+    @override_settings(
+        EMAIL_TRANSPORT='common.mail.PlunkTransport',
+        PLUNK_TRANSPORT={'POOL_SIZE': 2, 'CONNECT_TIMEOUT': 1, 'READ_TIMEOUT': 5, 'BATCH_SIZE': 10},
+    )
+    def test_plunk_batches_identical_emails(self):
+        OutboxEmail.queue('other@gmail.com', 'Reset', '<p>Code</p>')
+
+        with patch('requests.Session.post') as post:
+            self.assertIn('Delivered 3 emails', self.deliver(workers=1))
+
+        self.assertEqual(
+            [call.kwargs['json']['to'] for call in post.call_args_list],
+            [['other@gmail.com'], ['ok@gmail.com', 'flaky@gmail.com']],
+        )
+        self.assertEqual(post.call_args.kwargs['timeout'], (1, 5))
+
+    def test_delivers_and_retries_with_backoff(self):
+        out = self.deliver()
+
+        self.assertIn('Delivered 1 emails, 1 to retry, 0 failed; latency p50', out)
+        self.assertEqual([email.to for email in MemoryTransport.outbox], ['ok@gmail.com'])
+        self.welcome.refresh_from_db()
+        self.assertEqual((self.welcome.status, self.welcome.html), (OutboxEmail.Status.SENT, ''))
+        self.assertIsNotNone(self.welcome.delivery_latency)
+
+        self.flaky.refresh_from_db()
+        self.assertEqual((self.flaky.status, self.flaky.attempts), (OutboxEmail.Status.PENDING, 1))
+        self.assertEqual(self.flaky.last_error, 'Plunk is down')
+        self.assertGreaterEqual(self.flaky.next_attempt_at, timezone.now() + timedelta(seconds=9))
+
+        # not due yet, so nothing is claimed
+        self.assertEqual(self.deliver(), '')
+
+        OutboxEmail.objects.filter(pk=self.flaky.pk).update(next_attempt_at=timezone.now())
+        self.assertIn('0 to retry, 1 failed', self.deliver())
+        self.flaky.refresh_from_db()
+        self.assertEqual((self.flaky.status, self.flaky.attempts), (OutboxEmail.Status.FAILED, 2))
+
+    def test_purges_old_sent_and_failed_emails(self):
+        old = OutboxEmail.queue('old@gmail.com', 'Reset', '<p>Code</p>')
+        OutboxEmail.objects.filter(pk=old.pk).update(status=OutboxEmail.Status.SENT)
+        OutboxEmail.objects.filter(pk__in=[old.pk, self.flaky.pk]).update(created_at=timezone.now() - timedelta(days=8))
+        OutboxEmail.objects.filter(pk=self.welcome.pk).update(status=OutboxEmail.Status.FAILED)
+
+        self.assertIn('Purged 1 emails older than 7 days', self.deliver())
+        # the old pending email is still delivered, the recent failed one kept
+        self.assertEqual(set(OutboxEmail.objects.values_list('pk', flat=True)), {self.welcome.pk, self.flaky.pk})
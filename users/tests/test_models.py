@@ -123,3 +123,54 @@ class TestReviewModel(TestCase):
         )
 
         self.assertEqual(self.review.number_of_flags, 1)
+
+
+class TestDenormalizedCounters(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='tester@gmail.com',
+            name='Harper Lee',
+            country='China',
+            language='Chinese',
+        )
+        self.company = Company.objects.create(
+            company_name='Tech Solutions Inc.',
+            category='information_technology',
+            country='USA',
+            website='https://www.techsolutions.com',
+        )
+        self.review = Review.objects.create(
+            user=self.user,
+            company=self.company,
+            rating=5,
+            title='Excellent Service!',
+            review_body='Top-notch.',
+        )
+
+    def test_user_review_count(self):
+        self.assertEqual(self.user.review_count, 1)
+
+        self.review.delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.review_count, 0)
+
+    def test_review_like_and_flag_counts(self):
+        like = ReviewLikes.objects.create(user=self.user, review=self.review)
+        flag = ReviewFlags.objects.create(user=self.user, review=self.review)
+        like.save()
+        flag.save()
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.like_count, self.review.flag_count), (1, 1))
+
+        like.delete()
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.like_count, self.review.flag_count), (0, 1))
+
+    def test_deleting_user_removes_their_likes_and_flags_from_counts(self):
+        other = User.objects.create(email='other@gmail.com', name='Ada Obi', country='Nigeria', language='English')
+        ReviewLikes.objects.create(user=other, review=self.review)
+        ReviewFlags.objects.create(user=other, review=self.review)
+
+        other.delete()
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.like_count, self.review.flag_count), (0, 0))
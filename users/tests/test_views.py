@@ -1,16 +1,29 @@
+import json
+import base64
 import secrets
-from unittest.mock import patch
+from io import StringIO
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-from django.test import TestCase
+import jwt
+import pytest
+
+from django.db import DatabaseError, connection
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from django.core.cache import cache
+from django.core.signals import request_started, request_finished
+from django.core.management import call_command
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from users.models import User, Review
-from common.helpers import generate_access_token
-from business.models import Company
+from common.db import connection_stats
+from users.models import User, Review, OutboxEmail, ReviewLikes, like_count_buffer
+from common.helpers import generate_access_token, generate_refresh_token
+from business.models import Company, CategoryFacet
 
 
 class TestViews(TestCase):
@@ -41,6 +54,7 @@ class TestViews(TestCase):
         )
 
     def setUp(self):
+        cache.clear()  # OTP codes and rate limit windows
         self.client = APIClient()
         self.user = User.objects.create(**self.valid_user_data)
         self.token = generate_access_token(self.user)
@@ -55,8 +69,7 @@ class TestViews(TestCase):
             'review_body': 'I had a wonderful time with this company.',
         }
 
-    @patch('users.views.send_email')
-    def test_register_user(self, mock_send_email):
+    def test_register_user(self):
         self.user_data = {
             'email': 'test-mogbo@gmail.com',
             'name': 'Harper Lee',
@@ -69,11 +82,10 @@ class TestViews(TestCase):
         self.assertTrue(response.data['success'])
 
         self.assertTrue(User.objects.filter(email=self.valid_user_data['email']).exists())
-        self.assertIsNotNone(cache.get(f"otp:{self.valid_user_data['email']}"))
-        mock_send_email.assert_called_once()
+        self.assertIsNotNone(cache.get(f"otp:{self.user_data['email']}"))
+        self.assertEqual(OutboxEmail.objects.get().to, 'test-mogbo@gmail.com')
 
-    @patch('users.views.send_email')
-    def test_register_user_invalid_data(self, mock_send_email):
+    def test_register_user_invalid_data(self):
         invalid_data = self.valid_user_data.copy()
         invalid_data['email'] = 'invalid_email'
 
@@ -81,7 +93,7 @@ class TestViews(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertFalse(User.objects.filter(email='invalid_email').exists())
-        mock_send_email.assert_not_called()
+        self.assertFalse(OutboxEmail.objects.exists())
 
     def test_login_with_otp_success(self):
         otp = ''.join([str(secrets.randbelow(10)) for _ in range(4)])
@@ -138,6 +150,44 @@ class TestViews(TestCase):
         self.assertFalse(response.data['success'])
         self.assertEqual(response.data['error'], 'invalid otp')
 
+    @override_settings(OTP_RATE_LIMITS={'otp-issue': {'EMAIL': (2, 60), 'IP': (3, 60)}})
+    def test_login_otp_rate_limited(self):
+        url = reverse('get-user-login-otp')
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'email': self.user.email}).status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'email': self.user.email.upper()})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response['Retry-After']), range(1, 61))
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+        self.assertNotEqual(self.client.post(url, {'email': 'a@gmail.com'}).status_code, 429)
+        response = self.client.post(url, {'email': 'b@gmail.com'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(OTP_RATE_LIMITS={'otp-issue': {'EMAIL': (10, 60), 'IP': (2, 60)}})
+    def test_otp_rate_limit_ignores_spoofed_forwarded_for(self):
+        url = reverse('get-user-login-otp')
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            # the client sends its own X-Forwarded-For and the proxy appends the address it saw
+            for spoofed in ('198.51.100.1', '198.51.100.2'):
+                response = self.client.post(
+                    url, {'email': self.user.email}, HTTP_X_FORWARDED_FOR=f'{spoofed}, 203.0.113.7'
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            response = self.client.post(
+                url, {'email': self.user.email}, HTTP_X_FORWARDED_FOR='198.51.100.3, 203.0.113.7'
+            )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(OTP_RATE_LIMITS={'otp-verify': {'EMAIL': (1, 60), 'IP': (10, 60)}})
+    def test_login_with_otp_rate_limited(self):
+        data = {'email': self.user.email, 'otp': '0000'}
+        self.assertEqual(self.client.post(self.user_login_url, data).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.user_login_url, data).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
     def test_submit_review_authenticated(self):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
         review_data = self.create_test_review_data()
@@ -166,6 +216,54 @@ class TestViews(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(BULK_REVIEWS={'MAX_ITEMS': 10, 'BATCH_SIZE': 2})
+    def test_bulk_submit_reviews(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        reviews = [{**self.create_test_review_data(), 'rating': rating} for rating in (5, 4, 3)]
+
+        response = self.client.post(reverse('bulk-submit-review'), {'reviews': reviews}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['created'], 3)
+        self.assertEqual(Review.objects.filter(user=self.user).count(), 3)
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.review_count, self.company.rating_sum), (3, 12))
+        self.assertEqual(self.company.star_counts, {1: 0, 2: 0, 3: 1, 4: 1, 5: 1})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.review_count, 3)
+
+    def test_bulk_submit_reviews_reports_item_errors(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        reviews = [
+            self.create_test_review_data(),
+            {**self.create_test_review_data(), 'rating': 9},
+            {**self.create_test_review_data(), 'company': 'missing'},
+        ]
+
+        response = self.client.post(reverse('bulk-submit-review'), {'reviews': reviews}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([item['index'] for item in response.data['error']], [1, 2])
+        self.assertIn('rating', response.data['error'][0]['errors'])
+        self.assertIn('company', response.data['error'][1]['errors'])
+        self.assertFalse(Review.objects.exists())
+
+    @override_settings(BULK_REVIEWS={'MAX_ITEMS': 10, 'BATCH_SIZE': 1})
+    def test_bulk_submit_reviews_company_deleted_after_validation(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        reviews = [self.create_test_review_data(), {**self.create_test_review_data(), 'company': 'deleted'}]
+
+        with mock.patch('users.views.Company') as company_model:
+            company_model.objects.filter.return_value.values_list.return_value = [self.company.id, 'deleted']
+            response = self.client.post(reverse('bulk-submit-review'), {'reviews': reviews}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([item['index'] for item in response.data['error']], [1])
+        self.assertIn('company', response.data['error'][0]['errors'])
+        self.assertFalse(Review.objects.exists())
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.review_count, 0)
+
     def test_update_user_profile_success(self):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
 
@@ -201,6 +299,50 @@ class TestViews(TestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.data['error'], "You don't have permission to update this profile.")
 
+    def test_authenticated_user_cache(self):
+        Review.objects.create(user=self.user, company=self.company, rating=4, title='Good', review_body='Good.')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(User.get_cached(self.user.id), self.user)
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.update_profile_url, {'name': 'updateduser'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(User.get_cached(self.user.id).name, 'updateduser')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.review_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.patch(self.update_profile_url, {}).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_verified_token_is_decoded_once(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        with mock.patch('common.authentication.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(2):
+                response = self.client.patch(self.update_profile_url, {'name': 'updateduser'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        decode.assert_called_once()
+
+    def test_logout_revokes_tokens(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('user-logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.patch(self.update_profile_url, {'name': 'updateduser'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['error'], 'Token has been revoked')
+
+        self.user.refresh_from_db()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {generate_access_token(self.user)}')
+        response = self.client.patch(self.update_profile_url, {'name': 'updateduser'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_update_user_profile_invalid_data(self):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
         data = {
@@ -209,3 +351,375 @@ class TestViews(TestCase):
         response = self.client.patch(self.update_profile_url, data)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestRefreshTokenView(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='tester@gmail.com', name='Harper Lee', country='China', language='Chinese'
+        )
+        self.url = reverse('token-refresh')
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post(self.url, {'refresh_token': token})
+
+    def test_refresh_rotates_token(self):
+        response = self.refresh(generate_refresh_token(self.user))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tokens = response.data['data']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access_token"]}')
+        profile_url = reverse('update-profile', kwargs={'user_id': self.user.id})
+        self.assertEqual(self.client.patch(profile_url, {'name': 'updateduser'}).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.refresh(tokens['refresh_token']).status_code, status.HTTP_200_OK)
+
+    def test_replayed_refresh_token_revokes_family(self):
+        token = generate_refresh_token(self.user)
+        rotated = self.refresh(token).data['data']['refresh_token']
+
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['error'], 'Invalid refresh token')
+        self.assertEqual(self.refresh(rotated).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_token_types_are_not_interchangeable(self):
+        self.assertEqual(self.refresh(generate_access_token(self.user)).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {generate_refresh_token(self.user)}')
+        response = self.client.post(reverse('user-logout'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_untyped_tokens_are_not_access_tokens(self):
+        legacy_refresh_token = jwt.encode(
+            {'user_id': self.user.id, 'ver': self.user.token_version, 'exp': timezone.now() + timedelta(days=1)},
+            settings.JWT_AUTH['JWT_SECRET_KEY'],
+            algorithm=settings.JWT_AUTH['JWT_ALGORITHM'],
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {legacy_refresh_token}')
+
+        response = self.client.post(reverse('user-logout'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['error'], 'Invalid token')
+
+    def test_logout_revokes_refresh_tokens(self):
+        token = generate_refresh_token(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+
+        self.assertEqual(self.refresh(token).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestReviewListView(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            company_name='Tech Solutions Inc.',
+            category='information_technology',
+            country='USA',
+            website='techsolutions.com',
+        )
+        self.user = User.objects.create(
+            email='tester@gmail.com', name='Harper Lee', country='China', language='Chinese'
+        )
+        self.other_user = User.objects.create(
+            email='other@gmail.com', name='Ada Obi', country='Nigeria', language='English'
+        )
+        self.reviews = [
+            Review.objects.create(
+                user=self.user if index % 2 else self.other_user,
+                company=self.company,
+                rating=4,
+                title=f'Review {index}',
+                review_body='I had a wonderful time with this company.',
+            )
+            for index in range(5)
+        ]
+        self.client = APIClient()
+
+    def fetch_all(self, url):
+        ids = []
+        response = self.client.get(url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data['pagination'])
+            ids.extend(review['id'] for review in response.data['data'])
+            next_cursor = response.data['pagination']['next_cursor']
+            if next_cursor is None:
+                return ids
+            response = self.client.get(url, {'page_size': 2, 'cursor': next_cursor})
+
+    def test_reviews_feed_cursor_pagination(self):
+        ids = self.fetch_all(reverse('reviews-list'))
+
+        self.assertEqual(ids, [review.id for review in reversed(self.reviews)])
+
+    def test_reviews_feed_crafted_cursor(self):
+        for values in (['yesterday', 'abc'], [None, 'abc'], [{'a': 1}, 'abc']):
+            cursor = base64.urlsafe_b64encode(json.dumps({'v': values, 'r': False}).encode()).decode()
+            response = self.client.get(reverse('reviews-list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_user_reviews_cursor_pagination(self):
+        ids = self.fetch_all(reverse('user-reviews-list', kwargs={'user_id': self.user.id}))
+
+        self.assertEqual(ids, [self.reviews[3].id, self.reviews[1].id])
+
+    def test_reviews_feed_constant_queries(self):
+        ReviewLikes.objects.create(user=self.user, review=self.reviews[4])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('reviews-list'), {'page_size': 5})
+
+        latest = response.data['data'][0]
+        self.assertEqual(latest['like_count'], 1)
+        self.assertEqual(latest['flag_count'], 0)
+        self.assertEqual(latest['user']['number_of_reviews'], 3)
+        self.assertEqual(latest['company']['company_website'], self.company.website)
+
+    def test_review_detail(self):
+        review = self.reviews[1]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('review-detail', kwargs={'review_id': review.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['id'], review.id)
+        self.assertEqual(response.data['data']['user']['number_of_reviews'], 2)
+
+    def test_review_detail_conditional_get(self):
+        url = reverse('review-detail', kwargs={'review_id': self.reviews[1].id})
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        ReviewLikes.objects.add(self.other_user.id, self.reviews[1].id)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['like_count'], 1)
+
+
+@skipUnless(connection.settings_dict['ENGINE'] == 'common.db.postgresql', 'only common.db.postgresql records checkouts')
+class TestConnectionCheckout(TransactionTestCase):
+    def setUp(self):
+        # The test client disconnects close_old_connections, so check the connection in as it would
+        for signal in (request_started, request_finished):
+            signal.connect(self.check_in)
+            self.addCleanup(signal.disconnect, self.check_in)
+
+        patcher = mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        connection.close()  # reconnects as a persistent connection
+
+    def check_in(self, **_kwargs):
+        connection.close_if_unusable_or_obsolete()
+
+    def test_each_request_checks_out_connection_once(self):
+        before = connection_stats.snapshot()
+
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('reviews-list')).status_code, status.HTTP_200_OK)
+
+        after = connection_stats.snapshot()
+        self.assertEqual(after['checkouts'] - before['checkouts'], 3)
+        self.assertEqual(after['opened'] - before['opened'], 1)
+        self.assertEqual(after['reused'] - before['reused'], 2)
+
+
+class TestLikeReviewView(TestCase):
+    def setUp(self):
+        company = Company.objects.create(
+            company_name='Tech Solutions Inc.',
+            category='information_technology',
+            country='USA',
+            website='techsolutions.com',
+        )
+        self.user = User.objects.create(
+            email='tester@gmail.com', name='Harper Lee', country='China', language='Chinese'
+        )
+        self.review = Review.objects.create(
+            user=self.user, company=company, rating=4, title='Good', review_body='Good.'
+        )
+        self.url = reverse('like-review', kwargs={'review_id': self.review.id})
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {generate_access_token(self.user)}')
+
+    def test_like_is_idempotent(self):
+        for queries in (2, 1):  # the second request finds the user in user_cache
+            with self.assertNumQueries(queries):
+                response = self.client.post(self.url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['data'], {'review_id': self.review.id, 'liked': True, 'like_count': 1})
+
+        self.assertEqual(ReviewLikes.objects.filter(review=self.review).count(), 1)
+
+    def test_unlike_is_idempotent(self):
+        self.client.post(self.url)
+
+        for _ in range(2):
+            response = self.client.delete(self.url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['data']['like_count'], 0)
+
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.like_count, 0)
+        self.assertFalse(ReviewLikes.objects.exists())
+
+    def test_like_unknown_review(self):
+        url = reverse('like-review', kwargs={'review_id': 'missing'})
+
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(LIKE_WRITE_BEHIND={'ENABLED': True, 'FLUSH_BATCH_SIZE': 500})
+    def test_write_behind_like_counts(self):
+        cache.delete(like_count_buffer.name)
+        other = User.objects.create(email='other@gmail.com', name='Ada Obi', country='Nigeria', language='English')
+        ReviewLikes.objects.add(other.id, self.review.id)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.data['data']['like_count'], 2)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.like_count, 0)
+
+        detail = self.client.get(reverse('review-detail', kwargs={'review_id': self.review.id}))
+        self.assertEqual(detail.data['data']['like_count'], 2)
+
+        call_command('flush_like_counts', stdout=StringIO())
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.like_count, 2)
+        self.assertEqual(like_count_buffer.pending([self.review.id]), {})
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.data['data']['like_count'], 1)
+
+    @override_settings(LIKE_WRITE_BEHIND={'ENABLED': True, 'FLUSH_BATCH_SIZE': 500})
+    def test_failed_flush_puts_like_counts_back(self):
+        cache.delete(like_count_buffer.name)
+        self.client.post(self.url)
+
+        with (
+            mock.patch('django.db.models.QuerySet.update', side_effect=DatabaseError),
+            pytest.raises(DatabaseError),
+        ):
+            like_count_buffer.flush(Review, 'like_count')
+
+        self.assertEqual(like_count_buffer.pending([self.review.id]), {self.review.id: 1})
+        self.assertEqual(like_count_buffer.flush(Review, 'like_count'), 1)
+        self.assertEqual(like_count_buffer.flush(Review, 'like_count'), 0)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.like_count, 1)
+
+
+@override_settings(REVIEW_MODERATION={'HIDE_FLAG_COUNT': 3, 'HIDE_FLAG_RATIO': 0.6, 'MIN_FLAGS_FOR_RATIO': 2})
+class TestFlagReviewView(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(
+            company_name='Tech Solutions Inc.',
+            category='information_technology',
+            country='USA',
+            website='techsolutions.com',
+        )
+        self.users = [
+            User.objects.create(email=f'user{index}@gmail.com', name='Harper Lee', country='China', language='Chinese')
+            for index in range(4)
+        ]
+        self.review = Review.objects.create(
+            user=self.users[0], company=self.company, rating=1, title='Bad', review_body='Bad.'
+        )
+        self.url = reverse('flag-review', kwargs={'review_id': self.review.id})
+        self.client = APIClient()
+
+    def flag(self, user, method='post'):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {generate_access_token(user)}')
+        return getattr(self.client, method)(self.url)
+
+    def test_flag_and_unflag(self):
+        response = self.flag(self.users[1])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], {'review_id': self.review.id, 'flagged': True, 'flag_count': 1})
+
+        self.assertEqual(self.flag(self.users[1]).data['data']['flag_count'], 1)
+        self.assertEqual(self.flag(self.users[1], 'delete').data['data']['flag_count'], 0)
+
+    def test_hidden_by_flag_count(self):
+        for user in self.users[1:]:
+            ReviewLikes.objects.add(user.id, self.review.id)
+        for user in self.users[1:3]:
+            self.flag(user)
+
+        # two flags against three likes stays under the ratio
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.status, Review.Status.PUBLISHED)
+
+        self.flag(self.users[3])
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.status, Review.Status.HIDDEN)
+
+    def test_hidden_by_flag_ratio_and_excluded_from_listings(self):
+        for user in self.users[1:3]:
+            self.flag(user)
+
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.status, Review.Status.HIDDEN)
+
+        feed = self.client.get(reverse('reviews-list'))
+        self.assertEqual(feed.data['data'], [])
+        user_feed = self.client.get(reverse('user-reviews-list', kwargs={'user_id': self.users[0].id}))
+        self.assertEqual(user_feed.data['data'], [])
+        company_reviews = self.client.get(reverse('company-reviews', kwargs={'website': self.company.website}))
+        self.assertEqual(company_reviews.data['data']['reviews'], [])
+
+    def test_hidden_review_leaves_aggregates_until_unflagged(self):
+        for user in self.users[1:3]:
+            self.flag(user)
+
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.review_count, self.company.rating_sum, self.company.trust_score), (0, 0, 0))
+        self.assertEqual(CategoryFacet.objects.get(category='information_technology').review_count, 0)
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].review_count, 0)
+
+        self.flag(self.users[2], 'delete')
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.status, Review.Status.PUBLISHED)
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.review_count, self.company.rating_sum), (1, 1))
+        self.assertEqual(CategoryFacet.objects.get(category='information_technology').review_count, 1)
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].review_count, 1)
+
+        self.flag(self.users[2])
+        self.review.delete()
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.review_count, 0)
+        self.assertEqual(CategoryFacet.objects.get(category='information_technology').review_count, 0)
+
+    def test_deleted_flagger_republishes_review(self):
+        for user in self.users[1:3]:
+            self.flag(user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[2].delete()
+
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.flag_count, self.review.status), (1, Review.Status.PUBLISHED))
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.review_count, 1)
+
+    @override_settings(LIKE_WRITE_BEHIND={'ENABLED': True, 'FLUSH_BATCH_SIZE': 500})
+    def test_flag_ratio_counts_buffered_likes(self):
+        cache.delete(like_count_buffer.name)
+        ReviewLikes.objects.add(self.users[1].id, self.review.id)
+        ReviewLikes.objects.add(self.users[2].id, self.review.id)
+        for user in self.users[1:3]:
+            self.flag(user)
+
+        # two flags against two buffered likes stays under the ratio
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.like_count, self.review.status), (0, Review.Status.PUBLISHED))
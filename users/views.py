@@ -1,27 +1,35 @@
 import secrets
 
+import jwt
+
+from django.db import transaction
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.core.cache import cache
 
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
-from rest_framework.mixins import DestroyModelMixin
 from rest_framework.generics import ListAPIView, CreateAPIView, UpdateAPIView, DestroyAPIView, GenericAPIView
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.exceptions import NotFound, ValidationError, PermissionDenied, AuthenticationFailed
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
-from common.helpers import send_email, generate_access_token, generate_refresh_token
-from common.responses import success_response
-from common.pagination import CustomPagination
+from common.helpers import generate_access_token, generate_refresh_token
+from business.models import Company
+from common.responses import weak_etag, error_response, success_response, conditional_response
+from common.pagination import FeedPagination
+from common.throttling import SlidingWindowThrottle
 from common.authentication import IsOwnerOnly
 
-from .models import User, Review, ReviewLikes
+from .models import User, Review, OutboxEmail, ReviewFlags, ReviewLikes, MissingCompaniesError, like_count_buffer
 from .serializers import (
     UserSerializer,
     LoginSerializer,
     ReviewSerializer,
-    ReviewLikesSerializer,
+    BulkReviewSerializer,
     LoginWithOTPSerializer,
+    RefreshTokenSerializer,
 )
 
 
@@ -30,6 +38,8 @@ class RegisterUserAPIView(GenericAPIView):
 
     permission_classes = [AllowAny]
     serializer_class = UserSerializer
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'otp-issue'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -58,7 +68,7 @@ class RegisterUserAPIView(GenericAPIView):
         </html>
         """  # noqa: E501
 
-        send_email(to=email, subject=email_subject, html=email_body)
+        OutboxEmail.queue(to=email, subject=email_subject, html=email_body)
         serializer = self.get_serializer(user)
         response_data = serializer.data
 
@@ -71,6 +81,8 @@ class LoginOtpAPIView(GenericAPIView):
     """Endpoint to get login otp for a user."""
 
     serializer_class = LoginSerializer
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'otp-issue'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -97,7 +109,7 @@ class LoginOtpAPIView(GenericAPIView):
         </html>
         """  # noqa: E501
 
-        send_email(to=email, subject=email_subject, html=email_body)
+        OutboxEmail.queue(to=email, subject=email_subject, html=email_body)
 
         # TODO: remove, leave only for testing
         data = {'message': 'Login code sent to your email address', 'email': email, 'code': otp}
@@ -108,6 +120,8 @@ class LoginWithOtpAPIView(GenericAPIView):
     """Endpoint to login a user."""
 
     serializer_class = LoginWithOTPSerializer
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'otp-verify'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -141,6 +155,50 @@ class LoginWithOtpAPIView(GenericAPIView):
         )
 
 
+class RefreshTokenAPIView(GenericAPIView):
+    """Endpoint to exchange a refresh token for a new access token and a rotated refresh token."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    serializer_class = RefreshTokenSerializer
+    query_budget = 1  # user lookup, skipped when cached
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        msg = 'Invalid refresh token'
+        try:
+            payload = jwt.decode(
+                jwt=serializer.validated_data['refresh_token'],
+                key=settings.JWT_AUTH['JWT_SECRET_KEY'],
+                algorithms=[settings.JWT_AUTH['JWT_ALGORITHM']],
+            )
+        except jwt.InvalidTokenError as e:
+            raise AuthenticationFailed(msg) from e
+
+        user = User.get_cached(payload['user_id']) if payload.get('type') == 'refresh' else None
+        if user is None or payload.get('ver', 0) != user.token_version:
+            raise AuthenticationFailed(msg)
+
+        refresh_token = generate_refresh_token(user, rotated=payload)
+        if refresh_token is None:
+            raise AuthenticationFailed(msg)
+
+        data = {'access_token': generate_access_token(user), 'refresh_token': refresh_token}
+        return success_response(data, status.HTTP_200_OK)
+
+
+class LogoutAPIView(GenericAPIView):
+    """Endpoint to log a user out of every session by revoking all tokens issued to them."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        request.user.revoke_tokens()
+        return success_response({'message': 'Logged out'}, status.HTTP_200_OK)
+
+
 class UpdateUserProfileAPIView(UpdateAPIView):
     """Endpoint to update user detail"""
 
@@ -198,41 +256,117 @@ class SubmitReviewView(CreateAPIView):
             status=status.HTTP_200_OK,
         )
 
+
+class BulkSubmitReviewView(GenericAPIView):
+    """
+    Endpoint to submit many reviews at once, e.g. when importing review history.
+
+    Every item is validated before anything is written; if any fail, the response lists the errors
+    per item index and no review is created.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = BulkReviewSerializer
+
+    def post(self, request, *args, **kwargs):
+        items = request.data.get('reviews') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            msg = 'reviews: A non-empty list is required.'
+            raise ValidationError(msg)
+
+        max_items = settings.BULK_REVIEWS['MAX_ITEMS']
+        if len(items) > max_items:
+            msg = f'reviews: Ensure this list has no more than {max_items} items.'
+            raise ValidationError(msg)
+
+        serializers = [self.get_serializer(data=item) for item in items]
+        errors = {index: serializer.errors for index, serializer in enumerate(serializers) if not serializer.is_valid()}
+
+        company_ids = {serializer.validated_data['company'] for serializer in serializers if not serializer.errors}
+        known_ids = set(Company.objects.filter(pk__in=company_ids).values_list('pk', flat=True))
+        for index, serializer in enumerate(serializers):
+            company_id = None if serializer.errors else serializer.validated_data['company']
+            if company_id is not None and company_id not in known_ids:
+                errors[index] = self.missing_company_errors(company_id)
+
+        if errors:
+            return error_response([{'index': index, 'errors': errors[index]} for index in sorted(errors)])
+
+        reviews = [
+            Review(user=request.user, company_id=data.pop('company'), **data)
+            for data in (serializer.validated_data for serializer in serializers)
+        ]
+        try:
+            # One transaction, so a company deleted since the check above leaves nothing half-written
+            with transaction.atomic():
+                Review.objects.bulk_create_with_aggregates(reviews, settings.BULK_REVIEWS['BATCH_SIZE'])
+        except MissingCompaniesError as e:
+            return error_response(
+                [
+                    {'index': index, 'errors': self.missing_company_errors(review.company_id)}
+                    for index, review in enumerate(reviews)
+                    if review.company_id in e.company_ids
+                ]
+            )
+
+        return success_response({'created': len(reviews), 'ids': [review.id for review in reviews]})
+
+    @staticmethod
+    def missing_company_errors(company_id: str) -> dict:
+        return {'company': [f'Invalid pk "{company_id}" - object does not exist.']}
+
+
 class ReviewListView(ListAPIView):
-    """Endpoint to fetch all reviews by a User."""
+    """Endpoint to fetch the latest reviews, optionally only those by a User."""
 
-    queryset = Review.objects.all().order_by('-created_at')
+    queryset = Review.objects.published().select_related('user', 'company')
     serializer_class = ReviewSerializer
-    pagination_class = CustomPagination
+    pagination_class = FeedPagination
+    ordering = ('-created_at', '-id')
+    query_budget = 2  # auth + page
 
     def get_queryset(self):
         queryset = super().get_queryset()
         user_id = self.kwargs.get('user_id')
         if user_id:
-            queryset = queryset.filter(user__id=user_id)
+            queryset = queryset.filter(user_id=user_id)
 
         return queryset
 
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description='next_cursor or previous_cursor from a previous page',
+            ),
+        ]
+    )
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        return self.list(request, *args, **kwargs)
 
-        return success_response(serializer.data)
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        like_count_buffer.apply_pending(page, 'like_count')
+        return page
 
 
 class ReviewDetailAPIView(ListAPIView):
     """Endpoint to fetch details of a single review."""
 
-    lookup_field = 'review_id'
+    lookup_field = 'id'
+    lookup_url_kwarg = 'review_id'
     serializer_class = ReviewSerializer
-    queryset = Review.objects.get_queryset()
+    queryset = Review.objects.select_related('user', 'company')
+    query_budget = 2  # auth + review
 
     def get(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
+        like_count_buffer.apply_pending([instance], 'like_count')
+        etag = weak_etag(instance, instance.user, instance.company)
 
-        return success_response(data)
+        return conditional_response(request, etag, lambda: success_response(self.get_serializer(instance).data))
 
 class DeleteReviewAPIView(DestroyAPIView):
     """Endpoint to delete a review."""
@@ -261,26 +395,50 @@ class DeleteReviewAPIView(DestroyAPIView):
         }
         return success_response(response_data, status.HTTP_200_OK)
 
-#TODO: Test likes
-class LikeCreateAPIView(CreateAPIView, DestroyModelMixin):
-    serializer_class = ReviewLikesSerializer
-    permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        user = self.request.user
-        review = Review.objects.get(id=self.kwargs['review_id'])
-        return ReviewLikes.objects.filter(user=user, review=review)
+class ReviewReactionAPIView(GenericAPIView):
+    """Base for a user's reaction to a review: POST adds it, DELETE removes it, both idempotently."""
 
-    def perform_create(self, serializer):
-        if self.get_queryset().exists():
-            msg = 'You have already liked for this post'
-            raise ValidationError(msg)
-        serializer.save(user=self.request.user, review=Review.objects.get(id=self.kwargs['review_id']))
-        return success_response("review succesfully liked", status=status.HTTP_201_CREATED)
+    permission_classes = [IsAuthenticated]
+    reaction_model = None
+    reaction_name = None
+
+    def post(self, request, *args, **kwargs):
+        count = self.reaction_model.objects.add(request.user.id, self.kwargs['review_id'])
+        return self.reaction_response(count, active=True)
 
     def delete(self, request, *args, **kwargs):
-        if self.get_queryset().exists():
-            self.get_queryset().delete()
-            return success_response("review successfully deleted", status=status.HTTP_204_NO_CONTENT)
-        msg = 'You never liked for this post'
-        raise ValidationError(msg)
+        count = self.reaction_model.objects.remove(request.user.id, self.kwargs['review_id'])
+        return self.reaction_response(count, active=False)
+
+    def reaction_response(self, count: int | None, *, active: bool):
+        if count is None:
+            msg = 'Review not found.'
+            raise NotFound(msg)
+
+        data = {
+            'review_id': self.kwargs['review_id'],
+            self.reaction_name: active,
+            self.reaction_model.counter_field: count,
+        }
+        return success_response(data, status.HTTP_200_OK)
+
+
+class LikeCreateAPIView(ReviewReactionAPIView):
+    """Endpoint to like (POST) or unlike (DELETE) a review."""
+
+    reaction_model = ReviewLikes
+    reaction_name = 'liked'
+    # auth + one write statement; the fallback for other databases is not budgeted
+    query_budget = {'postgresql': 2}
+
+
+class FlagCreateAPIView(ReviewReactionAPIView):
+    """Endpoint to flag (POST) or unflag (DELETE) a review; flagged reviews may be hidden automatically."""
+
+    reaction_model = ReviewFlags
+    reaction_name = 'flagged'
+    # auth + one write statement + auto-hide check; when that hides or republishes the review, its
+    # aggregate move (company lock, status, company, facet and author counters) takes up to nine more.
+    # The fallback for other databases is not budgeted.
+    query_budget = {'postgresql': 12}